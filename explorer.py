@@ -39,7 +39,7 @@ with st.spinner("Loading libraries.."):
     from pandas.api.types import is_numeric_dtype
 
 
-    from salk_toolkit.io import load_parquet_with_metadata, read_json, extract_column_meta
+    from salk_toolkit.io import load_parquet_with_metadata, read_json, extract_column_meta, get_meta_index, DataMeta
     from salk_toolkit.pp import *
     from salk_toolkit.utils import *
     from salk_toolkit.dashboard import draw_plot_matrix, facet_ui, filter_ui, get_plot_width, default_translate
@@ -54,9 +54,14 @@ with st.spinner("Loading libraries.."):
 warnings.filterwarnings(action='ignore', category=UserWarning)
 warnings.filterwarnings(action='ignore', category=pd.errors.PerformanceWarning)
 
+# Indexed once, rather than on every rerun
+@st.cache_resource(show_spinner=False)
+def load_meta(fname):
+    return DataMeta(read_json(fname,replace_const=True))
+
 cl_args = sys.argv[1:] if len(sys.argv)>1 else []
 if len(cl_args)>0 and cl_args[0].endswith('.json'):
-    global_data_meta = read_json(cl_args[0],replace_const=True)
+    global_data_meta = load_meta(cl_args[0])
     cl_args = cl_args[1:]
 else: global_data_meta = None
 
@@ -91,7 +96,7 @@ input_files = st.sidebar.multiselect('Select files:',input_file_choices,default_
 def load_file(input_file):
     full_df, dmeta, mmeta = read_annotated_data(paths[input_file]+input_file, return_model_meta=True)
     n = len(full_df)
-    if dmeta is None: dmeta = {}
+    dmeta = DataMeta(dmeta) if dmeta is not None else {} # Indexed once per file, and passed on as is on every rerun
     return { 'data': full_df, 'data_n': n, 'data_meta': dmeta, 'model_meta': mmeta }
 
 if len(input_files)==0:
@@ -115,21 +120,21 @@ from pandas.api.types import is_datetime64_any_dtype as is_datetime
 if global_data_meta: st.sidebar.info('⚠️ External meta loaded.')
 
 def get_dimensions(data_meta, observations=True, whitelist=None):
-    c_meta = extract_column_meta(data_meta)
+    c_meta = get_meta_index(data_meta).col_meta
     res = []
     for g in data_meta['structure']:
         if g.get('hidden'): continue
         if 'scale' in g and observations:
             res.append(g['name'])
         else:
-            cols = [ c_meta[c].get('col_prefix','') + c for c in c_meta[g['name']]['columns']]
+            cols = [ c_meta.get(c,{}).get('col_prefix','') + c for c in c_meta[g['name']]['columns']]
             if whitelist is not None: cols = [ c for c in cols if c in whitelist ]
             res += cols
     return res
 
 args = {}
 
-c_meta = extract_column_meta(first_data_meta)
+c_meta = get_meta_index(first_data_meta).col_meta
 
 with st.sidebar: #.expander("Select dimensions"):
 
@@ -150,9 +155,9 @@ with st.sidebar: #.expander("Select dimensions"):
     obs_name = st.selectbox('Observation', obs_dims)
     args['res_col'] = obs_name
 
-    res_cont = not c_meta[args['res_col']].get('categories') or args.get('convert_res') == 'continuous'
+    res_cont = not c_meta.get(args['res_col'],{}).get('categories') or args.get('convert_res') == 'continuous'
 
-    all_dims = c_meta[obs_name].get('modifiers', []) + all_dims
+    all_dims = c_meta.get(obs_name,{}).get('modifiers', []) + all_dims
 
     facet_dims = all_dims
     if len(input_files)>1: facet_dims = ['input_file'] + facet_dims
@@ -259,13 +264,14 @@ elif input_files_facet:
     #with st.spinner('Filtering data...'):
     
     # This is a bit hacky because of previous use of the lazy data frames
-    dfs = []
+    dfs, timings = [], []
     for ifile in input_files:
         df, fargs = loaded[ifile]['data'], args.copy()
         fargs['filter'] = { k:v for k,v in fargs['filter'].items() if k in df.columns }
         fargs['factor_cols'] = [ f for f in fargs['factor_cols'] if f!='input_file' ]
-        pparams = get_filtered_data(df, first_data_meta, fargs)
-        dfs.append(pparams['data'])
+        with plot_trace() as trace:
+            pparams = cached_filtered_data(df, first_data_meta, fargs)
+        dfs.append(pparams['data']); timings += trace.records
 
     fdf = pd.concat(dfs)
 
@@ -278,12 +284,17 @@ elif input_files_facet:
         [ v for i,f in enumerate(input_files) for v in [f]*len(dfs[i]) ],input_files)
 
     pparams['data'] = fdf
-    plot = create_plot(pparams,first_data_meta,args,
-                       translate=translate,
-                       width=get_plot_width('full'),
-                       return_matrix_of_plots=matrix_form)
+    with plot_trace() as trace:
+        plot = create_plot(pparams,first_data_meta,args,
+                           translate=translate,
+                           width=get_plot_width('full'),
+                           return_matrix_of_plots=matrix_form, spec=True)
+    timings += trace.records
 
     draw_plot_matrix(plot,matrix_form=matrix_form)
+
+    with st.expander('Stage timings'):
+        st.dataframe(pd.DataFrame(timings), hide_index=True)
     #st.altair_chart(plot)#,use_container_width=True)
 
 else:
@@ -305,11 +316,12 @@ else:
             #with st.spinner('Filtering data...'):
             fargs = args.copy()
             fargs['filter'] = { k:v for k,v in args['filter'].items() if k in loaded[ifile]['data'].columns }
-            pparams = get_filtered_data(loaded[ifile]['data'], data_meta, fargs)
-            plot = create_plot(pparams,data_meta,fargs,
-                               translate=translate,
-                               width=get_plot_width(f'{i}_{ifile}'),
-                               return_matrix_of_plots=matrix_form)
+            with plot_trace() as trace: # Time each stage of the pipeline for the Stage timings panel
+                pparams = cached_filtered_data(loaded[ifile]['data'], data_meta, fargs)
+                plot = create_plot(pparams,data_meta,fargs,
+                                   translate=translate,
+                                   width=get_plot_width(f'{i}_{ifile}'),
+                                   return_matrix_of_plots=matrix_form, spec=True)
 
             #n_questions = pparams['data']['question'].nunique() if 'question' in pparams['data'] else 1
             #st.write('Based on %.1f%% of data' % (100*pparams['n_datapoints']/(len(loaded[ifile]['data_n'])*n_questions)))
@@ -317,8 +329,11 @@ else:
             #st.altair_chart(plot)#, use_container_width=(len(input_files)>1))
             draw_plot_matrix(plot,matrix_form=matrix_form)
 
+            with st.expander('Stage timings'):
+                st.dataframe(pd.DataFrame(trace.records), hide_index=True)
+
             with st.expander('Data Meta'):
-                st.json(loaded[ifile]['data_meta'])
+                st.json(dict(loaded[ifile]['data_meta']))
 
             mdl = loaded[ifile]['model_meta'].copy()
 
@@ -100,11 +100,37 @@ d = { 'settings': { 'branch': 'main',
                                                                                                       'salk_toolkit/election_models.py'),
                                               'salk_toolkit.election_models.simulate_election_pp': ( 'election_models.html#simulate_election_pp',
                                                                                                      'salk_toolkit/election_models.py')},
-            'salk_toolkit.io': { 'salk_toolkit.io.change_mapping': ('io.html#change_mapping', 'salk_toolkit/io.py'),
+            'salk_toolkit.io': { 'salk_toolkit.io.DataMeta': ('io.html#datameta', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.__eq__': ('io.html#datameta.__eq__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.__getitem__': ('io.html#datameta.__getitem__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.__hash__': ('io.html#datameta.__hash__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.__init__': ('io.html#datameta.__init__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.__iter__': ('io.html#datameta.__iter__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.__len__': ('io.html#datameta.__len__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.DataMeta.aliases': ('io.html#datameta.aliases', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.FrozenColumnMeta': ('io.html#frozencolumnmeta', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.FrozenColumnMeta.__contains__': ( 'io.html#frozencolumnmeta.__contains__',
+                                                                                    'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.FrozenColumnMeta.__getitem__': ( 'io.html#frozencolumnmeta.__getitem__',
+                                                                                   'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.FrozenColumnMeta.__init__': ('io.html#frozencolumnmeta.__init__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.FrozenColumnMeta.__iter__': ('io.html#frozencolumnmeta.__iter__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.FrozenColumnMeta.__len__': ('io.html#frozencolumnmeta.__len__', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.arrow_types_mapper': ('io.html#arrow_types_mapper', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.as_str': ('io.html#as_str', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.build_cli': ('io.html#build_cli', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.build_fingerprints': ('io.html#build_fingerprints', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.build_metas': ('io.html#build_metas', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.build_target': ('io.html#build_target', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.cached_json': ('io.html#cached_json', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.change_mapping': ('io.html#change_mapping', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.change_meta_df': ('io.html#change_meta_df', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.change_parquet_meta': ('io.html#change_parquet_meta', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.data_with_inferred_meta': ('io.html#data_with_inferred_meta', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.discover_build_targets': ('io.html#discover_build_targets', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.extract_column_meta': ('io.html#extract_column_meta', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.file_stamp': ('io.html#file_stamp', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.get_meta_index': ('io.html#get_meta_index', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.get_original_column_names': ('io.html#get_original_column_names', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.group_columns_dict': ('io.html#group_columns_dict', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.infer_meta': ('io.html#infer_meta', 'salk_toolkit/io.py'),
@@ -113,6 +139,9 @@ d = { 'settings': { 'branch': 'main',
                                  'salk_toolkit.io.load_parquet_metadata': ('io.html#load_parquet_metadata', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.load_parquet_with_metadata': ('io.html#load_parquet_with_metadata', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.load_population_h5': ('io.html#load_population_h5', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.meta_fingerprint': ('io.html#meta_fingerprint', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.meta_input_files': ('io.html#meta_input_files', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.meta_signature': ('io.html#meta_signature', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.process_annotated_data': ('io.html#process_annotated_data', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.read_and_process_data': ('io.html#read_and_process_data', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.read_annotated_data': ('io.html#read_annotated_data', 'salk_toolkit/io.py'),
@@ -121,16 +150,24 @@ d = { 'settings': { 'branch': 'main',
                                  'salk_toolkit.io.read_json': ('io.html#read_json', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.save_parquet_with_metadata': ('io.html#save_parquet_with_metadata', 'salk_toolkit/io.py'),
                                  'salk_toolkit.io.save_population_h5': ('io.html#save_population_h5', 'salk_toolkit/io.py'),
-                                 'salk_toolkit.io.save_sample_h5': ('io.html#save_sample_h5', 'salk_toolkit/io.py')},
+                                 'salk_toolkit.io.save_sample_h5': ('io.html#save_sample_h5', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.synthetic_column_spec': ('io.html#synthetic_column_spec', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.synthetic_column_values': ('io.html#synthetic_column_values', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.synthetic_data': ('io.html#synthetic_data', 'salk_toolkit/io.py'),
+                                 'salk_toolkit.io.write_synthetic_data': ('io.html#write_synthetic_data', 'salk_toolkit/io.py')},
             'salk_toolkit.plots': { 'salk_toolkit.plots.area_smooth': ('plots.html#area_smooth', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.barbell': ('plots.html#barbell', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.boxplot_lod': ('plots.html#boxplot_lod', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.boxplot_manual': ('plots.html#boxplot_manual', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.boxplot_vals': ('plots.html#boxplot_vals', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.cluster_based_reorder': ( 'plots.html#cluster_based_reorder',
                                                                                   'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.columns': ('plots.html#columns', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.columns_data': ('plots.html#columns_data', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.corr_matrix': ('plots.html#corr_matrix', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.corr_matrix_lod': ('plots.html#corr_matrix_lod', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.density': ('plots.html#density', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.density_lod': ('plots.html#density_lod', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.diff_columns': ('plots.html#diff_columns', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.draws_to_hdis': ('plots.html#draws_to_hdis', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.estimate_legend_columns_horiz': ( 'plots.html#estimate_legend_columns_horiz',
@@ -138,48 +175,119 @@ d = { 'settings': { 'branch': 'main',
                                     'salk_toolkit.plots.estimate_legend_columns_horiz_naive': ( 'plots.html#estimate_legend_columns_horiz_naive',
                                                                                                 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.facet_dist': ('plots.html#facet_dist', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.facet_dist_lod': ('plots.html#facet_dist_lod', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.fd_mangle': ('plots.html#fd_mangle', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.gb_n_groups': ('plots.html#gb_n_groups', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.geoplot': ('plots.html#geoplot', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.kde_1d': ('plots.html#kde_1d', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.kde_bw': ('plots.html#kde_bw', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.likert_aggregate': ('plots.html#likert_aggregate', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.likert_bars': ('plots.html#likert_bars', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.likert_bars_data': ('plots.html#likert_bars_data', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.likert_facets': ('plots.html#likert_facets', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.likert_rad_pol': ('plots.html#likert_rad_pol', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.lines': ('plots.html#lines', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.lines_hdi': ('plots.html#lines_hdi', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.linevals': ('plots.html#linevals', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.lod_input': ('plots.html#lod_input', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.lod_points': ('plots.html#lod_points', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.make_start_end': ('plots.html#make_start_end', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.marimekko': ('plots.html#marimekko', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.massplot': ('plots.html#massplot', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.matrix': ('plots.html#matrix', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.matrix_data': ('plots.html#matrix_data', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.ordered_population': ('plots.html#ordered_population', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.ordered_population_lod': ( 'plots.html#ordered_population_lod',
+                                                                                   'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.split_even_weight': ('plots.html#split_even_weight', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.split_ordered': ('plots.html#split_ordered', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.stacked_columns': ('plots.html#stacked_columns', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.stacked_columns_data': ('plots.html#stacked_columns_data', 'salk_toolkit/plots.py'),
                                     'salk_toolkit.plots.vectorized_mn': ('plots.html#vectorized_mn', 'salk_toolkit/plots.py'),
-                                    'salk_toolkit.plots.violin': ('plots.html#violin', 'salk_toolkit/plots.py')},
-            'salk_toolkit.pp': { 'salk_toolkit.pp.augment_draws': ('pp.html#augment_draws', 'salk_toolkit/pp.py'),
+                                    'salk_toolkit.plots.violin': ('plots.html#violin', 'salk_toolkit/plots.py'),
+                                    'salk_toolkit.plots.violin_lod': ('plots.html#violin_lod', 'salk_toolkit/plots.py')},
+            'salk_toolkit.pp': { 'salk_toolkit.pp.DataCube': ('pp.html#datacube', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.DataCube.__init__': ('pp.html#datacube.__init__', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.DataCube.applicable': ('pp.html#datacube.applicable', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.DataCube.query': ('pp.html#datacube.query', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.FilterIndex': ('pp.html#filterindex', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.FilterIndex.__init__': ('pp.html#filterindex.__init__', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.FilterIndex.mask': ('pp.html#filterindex.mask', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.PlotTrace': ('pp.html#plottrace', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.PlotTrace.__init__': ('pp.html#plottrace.__init__', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache': ('pp.html#resultcache', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache.__init__': ('pp.html#resultcache.__init__', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache.clear': ('pp.html#resultcache.clear', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache.disk_file': ('pp.html#resultcache.disk_file', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache.get': ('pp.html#resultcache.get', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache.metrics': ('pp.html#resultcache.metrics', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.ResultCache.put': ('pp.html#resultcache.put', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.augment_draws': ('pp.html#augment_draws', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.build_data_cube': ('pp.html#build_data_cube', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.cached_filtered_data': ('pp.html#cached_filtered_data', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.calculate_priority': ('pp.html#calculate_priority', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.canonical_pp_desc': ('pp.html#canonical_pp_desc', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.category_counts': ('pp.html#category_counts', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.column_stats': ('pp.html#column_stats', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.compute_column_stats': ('pp.html#compute_column_stats', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.compute_fingerprint': ('pp.html#compute_fingerprint', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.create_plot': ('pp.html#create_plot', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.create_tooltip': ('pp.html#create_tooltip', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.data_fingerprint': ('pp.html#data_fingerprint', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.data_refs': ('pp.html#data_refs', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.data_rows': ('pp.html#data_rows', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.discretize_continuous': ('pp.html#discretize_continuous', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.e2e_plot': ('pp.html#e2e_plot', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.e2e_plots': ('pp.html#e2e_plots', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.filter_mask': ('pp.html#filter_mask', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.filter_values': ('pp.html#filter_values', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.frame_columns': ('pp.html#frame_columns', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.get_all_plots': ('pp.html#get_all_plots', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.get_cat_num_vals': ('pp.html#get_cat_num_vals', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.get_cats': ('pp.html#get_cats', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.get_data_cube': ('pp.html#get_data_cube', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.get_filter_index': ('pp.html#get_filter_index', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.get_filtered_data': ('pp.html#get_filtered_data', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.get_plot_fn': ('pp.html#get_plot_fn', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.get_plot_meta': ('pp.html#get_plot_meta', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.group_codes': ('pp.html#group_codes', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.impute_factor_cols': ('pp.html#impute_factor_cols', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.inner_outer_factors': ('pp.html#inner_outer_factors', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.lazy_collect': ('pp.html#lazy_collect', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.lazy_filter': ('pp.html#lazy_filter', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.lazy_filter_values': ('pp.html#lazy_filter_values', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.matching_plots': ('pp.html#matching_plots', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.memoize_translate': ('pp.html#memoize_translate', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.meta_color_scale': ('pp.html#meta_color_scale', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.needed_columns': ('pp.html#needed_columns', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.parquet_filtered_data': ('pp.html#parquet_filtered_data', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.parquet_scan_range': ('pp.html#parquet_scan_range', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.parquet_value_range': ('pp.html#parquet_value_range', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.plot_names': ('pp.html#plot_names', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.plot_spec': ('pp.html#plot_spec', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.plot_trace': ('pp.html#plot_trace', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.prepare_pp_desc': ('pp.html#prepare_pp_desc', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.remove_from_internal_fcols': ('pp.html#remove_from_internal_fcols', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.restore_categoricals': ('pp.html#restore_categoricals', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.result_cache_key': ('pp.html#result_cache_key', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.sketch_aggregate': ('pp.html#sketch_aggregate', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.sketch_bin': ('pp.html#sketch_bin', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.sketch_level': ('pp.html#sketch_level', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.sketch_quantiles': ('pp.html#sketch_quantiles', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.stable_key_default': ('pp.html#stable_key_default', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.stack_columns': ('pp.html#stack_columns', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.stk_deregister': ('pp.html#stk_deregister', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.stk_plot': ('pp.html#stk_plot', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.strip_question_prefix': ('pp.html#strip_question_prefix', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.test_new_plot': ('pp.html#test_new_plot', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.trace_span': ('pp.html#trace_span', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.traced_stage': ('pp.html#traced_stage', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.transform_cont': ('pp.html#transform_cont', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.translate_df': ('pp.html#translate_df', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.translate_dtype': ('pp.html#translate_dtype', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.trim_categories': ('pp.html#trim_categories', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.weak_memo': ('pp.html#weak_memo', 'salk_toolkit/pp.py'),
+                                 'salk_toolkit.pp.weighted_crosstab': ('pp.html#weighted_crosstab', 'salk_toolkit/pp.py'),
                                  'salk_toolkit.pp.wrangle_data': ('pp.html#wrangle_data', 'salk_toolkit/pp.py')},
             'salk_toolkit.utils': { 'salk_toolkit.utils.aggregate_multiselect': ( 'utils.html#aggregate_multiselect',
                                                                                   'salk_toolkit/utils.py'),
@@ -211,7 +319,10 @@ d = { 'settings': { 'branch': 'main',
                                     'salk_toolkit.utils.replace_cat_with_dummies': ( 'utils.html#replace_cat_with_dummies',
                                                                                      'salk_toolkit/utils.py'),
                                     'salk_toolkit.utils.replace_constants': ('utils.html#replace_constants', 'salk_toolkit/utils.py'),
+                                    'salk_toolkit.utils.resolve_constants': ('utils.html#resolve_constants', 'salk_toolkit/utils.py'),
                                     'salk_toolkit.utils.stable_draws': ('utils.html#stable_draws', 'salk_toolkit/utils.py'),
                                     'salk_toolkit.utils.stk_defaultdict': ('utils.html#stk_defaultdict', 'salk_toolkit/utils.py'),
                                     'salk_toolkit.utils.str_replace': ('utils.html#str_replace', 'salk_toolkit/utils.py'),
-                                    'salk_toolkit.utils.to_alt_scale': ('utils.html#to_alt_scale', 'salk_toolkit/utils.py')}}}
+                                    'salk_toolkit.utils.take_frame': ('utils.html#take_frame', 'salk_toolkit/utils.py'),
+                                    'salk_toolkit.utils.to_alt_scale': ('utils.html#to_alt_scale', 'salk_toolkit/utils.py'),
+                                    'salk_toolkit.utils.with_columns': ('utils.html#with_columns', 'salk_toolkit/utils.py')}}}
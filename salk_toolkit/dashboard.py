@@ -26,7 +26,7 @@ from pandas.api.types import is_numeric_dtype
 
 from salk_toolkit.utils import *
 from salk_toolkit.io import *
-from salk_toolkit.pp import e2e_plot
+from salk_toolkit.pp import e2e_plot, column_stats, memoize_translate
 
 import streamlit as st
 from streamlit_option_menu import option_menu
@@ -56,9 +56,11 @@ def exists_fn(fname, *args, s3_fs=None, **kwargs):
 
 # %% ../nbs/05_dashboard.ipynb 6
 # ttl=None - never expire. Makes sense for potentially big data files
+# The meta is returned as a DataMeta, so its index is built once here and reused on every rerun
 @st.cache_resource(show_spinner=False,ttl=None)
 def read_annotated_data_cached(data_source,**kwargs):
-    return read_annotated_data(data_source,**kwargs)
+    df, meta, *rest = read_annotated_data(data_source,**kwargs)
+    return (df, DataMeta(meta) if meta is not None else None, *rest)
 
 # Load json uncached - useful for admin pages
 def load_json(fname, _s3_fs=None, **kwargs):
@@ -179,10 +181,11 @@ class SalkDashboardBuilder:
         self.sb_info = st.sidebar.empty()
         self.info = st.empty()
         
-        # Set up translation
+        # Set up translation. Each translator keeps its own memo, so it goes away with the builder and picks up changed PO files
         pot_updater = po_template_updater()
         translate = load_translate(translate)
-        self.tf = lambda s,**kwargs: translate(pot_updater(s,**kwargs))
+        self.tf = memoize_translate(lambda s,**kwargs: translate(pot_updater(s,**kwargs)))
+        self.tf_data = memoize_translate(lambda s,**kwargs: translate(pot_updater(s,context='data')))
         
         self.p_widths = {}
         
@@ -217,7 +220,7 @@ class SalkDashboardBuilder:
         
         # Draw plot
         st_plot(pp_desc,
-                width=width, translate=lambda s: self.tf(s,context='data'),
+                width=width, translate=self.tf_data,
                 full_df=self.df,data_meta=self.meta,**kwargs)
         
     def filter_ui(self, dims, detailed=False, raw=False, force_choice=False):
@@ -526,11 +529,15 @@ def draw_plot_matrix(pmat,matrix_form = False):
     cols = st.columns(len(pmat[0]))
     for j,c in enumerate(cols):
         for i, row in enumerate(pmat):
-            if j>=len(pmat[i]): continue
-            c.altair_chart(pmat[i][j])
+            if j>=len(pmat[i]) or pmat[i][j] is None: continue # Combinations without data are left empty
+            if isinstance(pmat[i][j],dict): c.vega_lite_chart(pmat[i][j]) # Vega-Lite spec
+            else: c.altair_chart(pmat[i][j])
 
 # Draw the plot described by pp_desc 
-def st_plot(pp_desc,**kwargs):
+# Pass cache=True to cache the filtered data (useful when many users look at the same plots), and spec=True to draw
+# Vega-Lite specs, so plots with spec templates skip building altair charts. Both are off by default, as with spec
+# the plots are dicts rather than altair charts
+def st_plot(pp_desc, **kwargs):
     matrix_form = (pp_desc['plot'] == 'geoplot')
     plots = e2e_plot(pp_desc, return_matrix_of_plots=matrix_form, **kwargs)
     draw_plot_matrix(plots, matrix_form=matrix_form)
@@ -572,8 +579,9 @@ def filter_ui(data, dmeta=None, dims=None, detailed=False, raw=False, translate=
         dims = [c for c in data.columns if c not in ['draw', 'weight', 'training_subsample'] ]  
     
     if dmeta is not None:
-        dims = list_aliases(dims, group_columns_dict(dmeta)) # Replace aliases like 'demographics'
-        c_meta = extract_column_meta(dmeta) # mainly for groups defined in meta
+        dmi = get_meta_index(dmeta)
+        dims = dmi.aliases(dims) # Replace aliases like 'demographics'
+        c_meta = dmi.col_meta # mainly for groups defined in meta
     else: c_meta = defaultdict(lambda: {})
     
     if not force_choice: f_info = st.sidebar.container()
@@ -592,7 +600,7 @@ def filter_ui(data, dmeta=None, dims=None, detailed=False, raw=False, translate=
             # Do some prep for translations
             r_map = dict(zip([tf(c) for c in col.dtype.categories],col.dtype.categories))
             all_vals = list(r_map.keys()) # translated categories
-            grp_names = c_meta[cn].get('groups',{}).keys()
+            grp_names = c_meta.get(cn,{}).get('groups',{}).keys()
             r_map.update(dict(zip([tf(c) for c in grp_names],grp_names)))
             
         if detailed and col.dtype.name=='category': # Multiselect
@@ -613,7 +621,8 @@ def filter_ui(data, dmeta=None, dims=None, detailed=False, raw=False, translate=
             if f_res != (all_vals[0],all_vals[-1]): 
                 filters[cn] = [None]+[r_map[f_res[0]],r_map[f_res[1]]]
         elif is_numeric_dtype(col) and col.dtype!='bool': # Continuous
-            mima = (col.min(),col.max())
+            stats = column_stats(data,cn)
+            mima = (stats['min'],stats['max'])
             if mima[0]==mima[1]: continue
             f_res = stc.slider(tf(cn),*mima,value=mima)
             if f_res != mima: filters[cn] = [None] + list(f_res)
@@ -622,7 +631,6 @@ def filter_ui(data, dmeta=None, dims=None, detailed=False, raw=False, translate=
             
     return filters
 
-
 # %% ../nbs/05_dashboard.ipynb 27
 # Use dict here as dicts are ordered as of Python 3.7 and preserving order groups things together better
 
@@ -1,19 +1,29 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/01_io.ipynb.
 
 # %% auto 0
-__all__ = ['max_cats', 'custom_meta_key', 'read_json', 'process_annotated_data', 'read_annotated_data', 'extract_column_meta',
-           'group_columns_dict', 'list_aliases', 'change_meta_df', 'change_parquet_meta', 'infer_meta',
-           'data_with_inferred_meta', 'read_and_process_data', 'save_population_h5', 'load_population_h5',
-           'save_sample_h5', 'save_parquet_with_metadata', 'load_parquet_metadata', 'load_parquet_with_metadata']
+__all__ = ['meta_index_cache', 'meta_index_cache_size', 'meta_index_lock', 'max_cats', 'custom_meta_key', 'read_json',
+           'process_annotated_data', 'read_annotated_data', 'extract_column_meta', 'group_columns_dict', 'list_aliases',
+           'FrozenColumnMeta', 'meta_fingerprint', 'meta_signature', 'DataMeta', 'get_meta_index', 'change_meta_df',
+           'change_parquet_meta', 'infer_meta', 'data_with_inferred_meta', 'read_and_process_data',
+           'save_population_h5', 'load_population_h5', 'save_sample_h5', 'save_parquet_with_metadata',
+           'load_parquet_metadata', 'arrow_types_mapper', 'load_parquet_with_metadata', 'meta_input_files',
+           'file_stamp', 'discover_build_targets', 'build_fingerprints', 'build_target', 'build_metas', 'build_cli',
+           'synthetic_column_spec', 'synthetic_column_values', 'synthetic_data', 'write_synthetic_data']
 
 # %% ../nbs/01_io.ipynb 3
-import json, os, warnings
+import json, os, warnings, glob, argparse, threading
 import itertools as it
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from copy import deepcopy
+from collections.abc import Mapping
+from types import MappingProxyType
+from hashlib import sha256
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 import numpy as np
 import pandas as pd
 import polars as pl
+from scipy.special import ndtr
 import datetime as dt
 
 from typing import List, Tuple, Dict, Union, Optional
@@ -23,17 +33,48 @@ import pyarrow.parquet as pq
 import pyreadstat
 
 import salk_toolkit as stk
-from salk_toolkit.utils import replace_constants, is_datetime, warn
+from salk_toolkit.utils import resolve_constants, is_datetime, warn
 
 # %% ../nbs/01_io.ipynb 4
-def read_json(fname,replace_const=True):
-    with open(fname,'r') as jf:
-        meta = json.load(jf)
-    if replace_const:
-        meta = replace_constants(meta)
-    return meta
+# Parsed (and constant-resolved) json files, validated by modification time and size
+# so repeated loads (i.e. on every streamlit rerun) skip both parsing and resolving. Holds the json_cache_size most recently read files
+json_cache, json_cache_size = OrderedDict(), 64
+json_cache_lock = threading.Lock()
+
+# NB! The result is the cached object itself, shared between calls, so it must not be modified (read_json gives a copy)
+def cached_json(fname,replace_const=True):
+    st = os.stat(fname)
+    path, stamp = os.path.abspath(fname), (st.st_mtime_ns, st.st_size)
+    with json_cache_lock:
+        ce = json_cache.get(path)
+        if ce is not None and ce['stamp'] == stamp: json_cache.move_to_end(path)
+    if ce is None or ce['stamp'] != stamp:
+        with open(fname,'r') as jf:
+            ce = { 'stamp': stamp, 'raw': json.load(jf) }
+        with json_cache_lock:
+            json_cache[path] = ce
+            json_cache.move_to_end(path)
+            if len(json_cache) > json_cache_size: json_cache.popitem(last=False)
+    if not replace_const: return ce['raw']
+    if 'resolved' not in ce: ce['resolved'] = resolve_constants(ce['raw']) # If two threads race here, both compute the same value
+    return ce['resolved']
+
 
 # %% ../nbs/01_io.ipynb 5
+# Read a json file, with the constants in it resolved unless replace_const=False
+# The result is a copy of the cached file, so the caller is free to modify it
+def read_json(fname,replace_const=True):
+    return deepcopy(cached_json(fname,replace_const))
+
+
+# %% ../nbs/01_io.ipynb 7
+# Convert to strings, leaving arrow-backed string columns as they are
+# (astype('str') would copy them to python objects and turn nulls into '<NA>')
+def as_str(s):
+    if isinstance(s.dtype,pd.ArrowDtype) and (pa.types.is_string(s.dtype.pyarrow_dtype) or pa.types.is_large_string(s.dtype.pyarrow_dtype)): return s
+    return s.astype('str')
+
+# %% ../nbs/01_io.ipynb 8
 # Read files listed in meta['file'] or meta['files']
 def read_concatenate_files_list(meta,data_file=None,path=None):
 
@@ -103,24 +144,30 @@ def read_concatenate_files_list(meta,data_file=None,path=None):
 
     return fdf, (metas[-1] if metas else None)
 
-# %% ../nbs/01_io.ipynb 6
+# %% ../nbs/01_io.ipynb 9
 # Default usage with mature metafile: process_annotated_data(<metafile name>)
 # When figuring out the metafile, it can also be run as: process_annotated_data(meta=<dict>, data_file=<>)
 def process_annotated_data(meta_fname=None, meta=None, data_file=None, raw_data=None, return_meta=False, only_fix_categories=False, return_raw=False, virtual_pass=False):
     # Read metafile
     if meta_fname is not None:
-        meta = read_json(meta_fname,replace_const=False)
+        meta = cached_json(meta_fname,replace_const=False)
     
     # Setup constants with a simple replacement mechanic
-    constants = meta['constants'] if 'constants' in meta else {}
-    meta = replace_constants(meta)
+    # They are copied, as preprocessing may modify them and the meta can come from the json cache
+    constants = deepcopy(meta['constants']) if 'constants' in meta else {}
+    meta = cached_json(meta_fname) if meta_fname is not None else resolve_constants(meta) # Resolved meta is cached for files
     
     # Read datafile(s)
     if raw_data is None:
         raw_data, inp_meta = read_concatenate_files_list(meta,data_file,path=meta_fname)
         if inp_meta is not None: warn(f"Processing main meta file") # Print this to separate warnings for input jsons from main 
 
-    if return_raw: return (raw_data, meta) if return_meta else raw_data
+    if return_raw: return (raw_data, deepcopy(meta) if meta_fname is not None else meta) if return_meta else raw_data
+    
+    # Inferred categories are written back into the meta below, but the rest of it is shared with the input (and the json cache)
+    # so give the groups that infer their own copy
+    infers = [ any(type(t)==list and type(t[-1])==dict and t[-1].get('categories')=='infer' for t in g['columns']) for g in meta['structure'] ]
+    if any(infers): meta = { **meta, 'structure': [ deepcopy(g) if inf else g for g, inf in zip(meta['structure'],infers) ] }
     
     globs = {'pd':pd, 'np':np, 'stk':stk, 'df':raw_data, **constants }
     
@@ -171,10 +218,10 @@ def process_annotated_data(meta_fname=None, meta=None, data_file=None, raw_data=
             if not only_fix_categories:
                 if s.dtype.name=='category': s = s.astype('object') # This makes it easier to use common ops like replace and fillna
                 if 'translate' in cd: 
-                    s = s.astype('str').replace(cd['translate']).replace('nan',None).replace('None',None)
+                    s = as_str(s).replace(cd['translate']).replace('nan',None).replace('None',None)
                 if 'transform' in cd: s = eval(cd['transform'],{ 's':s, 'df':raw_data, 'ndf':ndf, 'pd':pd, 'np':np, 'stk':stk , **constants })
                 if 'translate_after' in cd: 
-                    s = pd.Series(s).astype('str').replace(cd['translate_after']).replace('nan',None).replace('None',None)
+                    s = as_str(pd.Series(s)).replace(cd['translate_after']).replace('nan',None).replace('None',None)
                 
                 if cd.get('datetime'): s = pd.to_datetime(s,errors='coerce')
                 elif cd.get('continuous'): s = pd.to_numeric(s,errors='coerce')
@@ -198,7 +245,7 @@ def process_annotated_data(meta_fname=None, meta=None, data_file=None, raw_data=
                 cats = cd['categories']
                 s_rep = s.dropna().iloc[0] # Find a non-na element
                 if isinstance(s_rep,list) or isinstance(s_rep,np.ndarray): ns = s #  Just leave a list of strings
-                else: ns = pd.Series(pd.Categorical(s.astype('str'), # Convert to strings, even if numeric/boolean
+                else: ns = pd.Series(pd.Categorical(as_str(s), # Convert to strings, even if numeric/boolean
                                                     categories=cats,ordered=cd['ordered'] if 'ordered' in cd else False), name=cn, index=raw_data.index)
                 # Check if the category list provided was comprehensive
                 new_nas = ns.isna().sum() - na_sum
@@ -219,18 +266,19 @@ def process_annotated_data(meta_fname=None, meta=None, data_file=None, raw_data=
         exec(meta[pp_key],globs)
         ndf = globs['df']
     
+    if return_meta and meta_fname is not None: meta = deepcopy(meta) # Do not hand out parts of the cached meta
     return (ndf, meta) if return_meta else ndf
 
-# %% ../nbs/01_io.ipynb 7
+# %% ../nbs/01_io.ipynb 10
 # Read either a json annotation and process the data, or a processed parquet with the annotation attached
 # Return_raw is here for easier debugging of metafiles and is not meant to be used in production
-def read_annotated_data(fname, infer=True, return_raw=False, return_model_meta=False):
+def read_annotated_data(fname, infer=True, return_raw=False, return_model_meta=False, arrow_dtypes=False):
     _, ext = os.path.splitext(fname)
     meta, model_meta = None, None
     if ext == '.json':
         data, meta =  process_annotated_data(fname, return_meta=True, return_raw=return_raw)
     elif ext == '.parquet':
-        data, full_meta = load_parquet_with_metadata(fname)
+        data, full_meta = load_parquet_with_metadata(fname, arrow_dtypes=arrow_dtypes)
         if full_meta is not None: 
             meta, model_meta = full_meta.get('data'), full_meta.get('model')
             if meta is not None and not return_raw: # Do the second, virtual pass
@@ -244,7 +292,7 @@ def read_annotated_data(fname, infer=True, return_raw=False, return_model_meta=F
     meta = infer_meta(fname,meta_file=False)
     return process_annotated_data(fname, meta=meta, return_meta=True) + mm
 
-# %% ../nbs/01_io.ipynb 8
+# %% ../nbs/01_io.ipynb 12
 # Helper functions designed to be used with the annotations
 
 # Convert data_meta into a dict where each group and column maps to their metadata dict
@@ -261,7 +309,7 @@ def extract_column_meta(data_meta):
 # Convert data_meta into a dict of group_name -> [column names]
 # TODO: deprecate - info available in extract_column_meta
 def group_columns_dict(data_meta):
-    return { k: d['columns'] for k,d in extract_column_meta(data_meta).items() if 'columns' in d }
+    return dict(get_meta_index(data_meta).group_columns)
 
     #return { g['name'] : [(t[0] if type(t)!=str else t) for t in g['columns']] for g in data_meta['structure'] }
 
@@ -269,7 +317,7 @@ def group_columns_dict(data_meta):
 def list_aliases(lst, da):
     return [ fv for v in lst for fv in (da[v] if isinstance(v,str) and v in da else [v]) ]
 
-# %% ../nbs/01_io.ipynb 10
+# %% ../nbs/01_io.ipynb 14
 # Creates a mapping old -> new
 def get_original_column_names(dmeta):
     res = {}
@@ -290,15 +338,86 @@ def change_mapping(ot, nt, only_matches=False):
                  **{ k:v for k, v in nt.items() if k not in ot }, # do those in nt not in ot
                  **matches } 
 
-# %% ../nbs/01_io.ipynb 11
+# %% ../nbs/01_io.ipynb 15
+# Read-only version of the dict returned by extract_column_meta
+# Unlike that defaultdict, unknown keys raise KeyError, so use c_meta.get(k,{}) for columns that may not be in the meta
+class FrozenColumnMeta(Mapping):
+
+    def __init__(self, col_meta):
+        self._d = { k: MappingProxyType(v) for k,v in col_meta.items() }
+
+    def __getitem__(self, k): return self._d[k]
+    def __contains__(self, k): return k in self._d
+    def __iter__(self): return iter(self._d)
+    def __len__(self): return len(self._d)
+
+# Content hash of a data_meta
+def meta_fingerprint(data_meta):
+    return sha256(json.dumps(data_meta,sort_keys=True,default=str).encode('utf-8')).hexdigest()
+
+# Cheap check for in-place changes to a meta: the identities and sizes of its groups, their column lists and scales
+# It does not look inside the meta of single columns, so after changing one of those, pass a new meta (or DataMeta)
+def meta_signature(data_meta):
+    return (len(data_meta), id(data_meta.get('structure')),
+            *( (id(g), len(g), id(g.get('columns')), len(g.get('columns',[])), id(g.get('scale')), len(g.get('scale',{})))
+               for g in data_meta.get('structure',[]) ))
+
+# Immutable, hashable index over a data_meta: column -> meta, group -> columns, original names
+# Behaves like the (read-only) data_meta dict itself so it can be passed anywhere a data_meta is expected
+# It holds its own copy of the meta, so the content it is hashed by can not change under it
+class DataMeta(Mapping):
+
+    def __init__(self, data_meta):
+        if isinstance(data_meta,DataMeta): self.__dict__.update(data_meta.__dict__); return # Nothing to copy, as it is immutable
+        self.meta = deepcopy(data_meta)
+        self.fingerprint = meta_fingerprint(self.meta)
+        cm = extract_column_meta(self.meta)
+        self.col_meta = FrozenColumnMeta(cm)
+        self.group_columns = MappingProxyType({ k: d['columns'] for k,d in cm.items() if 'columns' in d })
+        self.original_names = MappingProxyType(get_original_column_names(self.meta))
+
+    # Replace group names in a list with their columns
+    def aliases(self, lst):
+        return list_aliases(lst,self.group_columns)
+
+    def __getitem__(self, k): return self.meta[k]
+    def __iter__(self): return iter(self.meta)
+    def __len__(self): return len(self.meta)
+
+    # Hash by content (fingerprint) so equal metas loaded separately (i.e. on different streamlit reruns) match
+    def __hash__(self): return hash(self.fingerprint)
+    def __eq__(self, other):
+        if isinstance(other,DataMeta): return self.fingerprint == other.fingerprint
+        return self.meta == other
+
+# Index is built once per meta object, and built again if the meta has been modified in place since (see meta_signature)
+# Keep a reference to the meta so its id can not be reused while cached
+# Code that uses the same meta over and over (i.e. on every streamlit rerun) should hold a DataMeta and pass that instead
+meta_index_cache, meta_index_cache_size = {}, 32
+meta_index_lock = threading.Lock()
+def get_meta_index(data_meta):
+    if isinstance(data_meta,DataMeta): return data_meta
+    sig = meta_signature(data_meta)
+    with meta_index_lock:
+        meta, msig, dmi = meta_index_cache.get(id(data_meta),(None,None,None))
+    if meta is data_meta and msig == sig: return dmi
+
+    dmi = DataMeta(data_meta)
+    with meta_index_lock:
+        if id(data_meta) not in meta_index_cache and len(meta_index_cache)>=meta_index_cache_size:
+            del meta_index_cache[next(iter(meta_index_cache))]
+        meta_index_cache[id(data_meta)] = (data_meta,sig,dmi)
+    return dmi
+
+# %% ../nbs/01_io.ipynb 17
 # Change an existing dataset to correspond better to a new meta_data
 # This is intended to allow making small improvements in the meta even after a model has been run
 # It is by no means perfect, but is nevertheless a useful tool to avoid re-running long pymc models for simple column/translation changes
 def change_meta_df(df, old_dmeta, new_dmeta):
     warn("This tool handles only simple cases of column name, translation and category order changes.")
     
-    # Ready the metafiles for parsing
-    old_dmeta = replace_constants(old_dmeta); new_dmeta = replace_constants(new_dmeta)
+    # Ready the metafiles for parsing (they are only read here, so no need to copy them)
+    old_dmeta = resolve_constants(old_dmeta); new_dmeta = resolve_constants(new_dmeta)
     
     # Rename columns 
     ocn, ncn = get_original_column_names(old_dmeta), get_original_column_names(new_dmeta)
@@ -357,12 +476,11 @@ def change_parquet_meta(orig_file,data_metafile,new_file):
     return df, meta
 
 
-# %% ../nbs/01_io.ipynb 12
+# %% ../nbs/01_io.ipynb 18
 def is_categorical(col):
-    return col.dtype.name in ['object', 'str', 'category'] and not is_datetime(col)
-
+    return (pd.api.types.is_string_dtype(col.dtype) or col.dtype.name=='category') and not is_datetime(col)
 
-# %% ../nbs/01_io.ipynb 13
+# %% ../nbs/01_io.ipynb 19
 max_cats = 50
 
 # Create a very basic metafile for a dataset based on it's contents
@@ -475,7 +593,7 @@ def data_with_inferred_meta(data_file, **kwargs):
     return process_annotated_data(meta=meta, data_file=data_file, return_meta=True)
 
 
-# %% ../nbs/01_io.ipynb 15
+# %% ../nbs/01_io.ipynb 21
 def read_and_process_data(desc, return_meta=False, constants={}, skip_postprocessing=False):
 
     df, meta = read_concatenate_files_list(desc)
@@ -492,7 +610,7 @@ def read_and_process_data(desc, return_meta=False, constants={}, skip_postproces
     
     return (df, meta) if return_meta else df
 
-# %% ../nbs/01_io.ipynb 17
+# %% ../nbs/01_io.ipynb 23
 def save_population_h5(fname,pdf):
     hdf = pd.HDFStore(fname,complevel=9, complib='zlib')
     hdf.put('population',pdf,format='table')
@@ -504,7 +622,7 @@ def load_population_h5(fname):
     hdf.close()
     return res
 
-# %% ../nbs/01_io.ipynb 18
+# %% ../nbs/01_io.ipynb 24
 def save_sample_h5(fname,trace,COORDS = None, filter_df = None):
     odims = [d for d in trace.predictions.dims if d not in ['chain','draw','obs_idx']]
     
@@ -545,7 +663,7 @@ def save_sample_h5(fname,trace,COORDS = None, filter_df = None):
     hdf.close()
 
 
-# %% ../nbs/01_io.ipynb 19
+# %% ../nbs/01_io.ipynb 25
 # These two very helpful functions are borrowed from https://towardsdatascience.com/saving-metadata-with-dataframes-71f51f558d8e
 
 custom_meta_key = 'salk-toolkit-meta'
@@ -572,16 +690,23 @@ def load_parquet_metadata(file_name):
     else: restored_meta = None
     return restored_meta
     
+# Map arrow string columns to pd.ArrowDtype instead of python objects
+# Dictionary encoded columns are left to the default conversion as the rest of the pipeline relies on pd.Categorical
+def arrow_types_mapper(pa_type):
+    if pa.types.is_string(pa_type) or pa.types.is_large_string(pa_type): return pd.ArrowDtype(pa_type)
+    return None
+
 # Load parquet with metadata
-def load_parquet_with_metadata(file_name,lazy=False,**kwargs):
+# arrow_dtypes=True keeps strings as arrow-backed columns instead of converting them to numpy object columns
+def load_parquet_with_metadata(file_name,lazy=False,arrow_dtypes=False,**kwargs):
     if lazy: # Load it as a polars lazy dataframe
         meta = load_parquet_metadata(file_name)
-        pl.scan_parquet(file_name,**kwargs)
+        ldf = pl.scan_parquet(file_name,**kwargs)
         return ldf, meta
     
     # Read it as a normal pandas dataframe
     restored_table = pq.read_table(file_name,**kwargs)
-    restored_df = restored_table.to_pandas()
+    restored_df = restored_table.to_pandas(types_mapper=arrow_types_mapper if arrow_dtypes else None)
     if custom_meta_key.encode() in restored_table.schema.metadata:
         restored_meta_json = restored_table.schema.metadata[custom_meta_key.encode()]
         restored_meta = json.loads(restored_meta_json)
@@ -590,3 +715,199 @@ def load_parquet_with_metadata(file_name,lazy=False,**kwargs):
     return restored_df, restored_meta
 
 
+# %% ../nbs/01_io.ipynb 28
+# Build the parquet files for a directory of meta files, make-style
+# Every <name>.json with a 'structure' is a target, built into <name>.parquet next to it
+# Metas that read the output (or the meta itself) of another meta through 'file'/'files' depend on it
+# Targets are skipped if the fingerprint of the meta and its inputs matches the one stored in the parquet
+
+# Files listed in meta['file'] or meta['files'] as absolute paths (relative to the meta, as in read_concatenate_files_list)
+def meta_input_files(meta, meta_file):
+    files = [meta['file']] if 'file' in meta else meta.get('files',[])
+    return [ os.path.abspath(os.path.join(os.path.dirname(meta_file), f['file'] if isinstance(f,dict) else f)) for f in files ]
+
+# Cheap stand-in for the contents of a source file
+def file_stamp(fname):
+    if not os.path.exists(fname): return 'missing'
+    st = os.stat(fname)
+    return f'{st.st_mtime_ns}:{st.st_size}'
+
+# Find all meta files under path and what they depend on
+def discover_build_targets(path):
+    targets = {}
+    for mf in sorted(glob.glob(os.path.join(path,'**','*.json'),recursive=True)):
+        if '.ipynb_checkpoints' in mf: continue
+        mf = os.path.abspath(mf)
+        meta = cached_json(mf,replace_const=False)
+        if not isinstance(meta,dict) or 'structure' not in meta: continue
+        targets[mf] = { 'meta': meta, 'inputs': meta_input_files(meta,mf), 'out': os.path.splitext(mf)[0]+'.parquet' }
+
+    producer = { **{ t: t for t in targets }, **{ td['out']: t for t, td in targets.items() } }
+    for td in targets.values():
+        td['deps'] = [ producer[f] for f in td['inputs'] if f in producer ]
+    return targets
+
+# Fingerprint each target from its meta and its inputs, using the fingerprints of upstream targets instead of their files
+# so it can be computed before anything is built
+def build_fingerprints(targets):
+    fps, visiting = {}, set()
+    def fp(t):
+        if t in fps: return fps[t]
+        if t in visiting: raise Exception(f"Circular dependency between meta files involving {t}")
+        visiting.add(t)
+        td, deps = targets[t], dict(zip(targets[t]['inputs'],targets[t]['deps']))
+        h = sha256(json.dumps(td['meta'],sort_keys=True).encode())
+        for f in td['inputs']:
+            h.update((fp(deps[f]) if f in deps else file_stamp(f)).encode())
+        fps[t] = h.hexdigest()
+        return fps[t]
+    for t in targets: fp(t)
+    return fps
+
+def build_target(meta_file, out_file, fingerprint):
+    df, meta = process_annotated_data(meta_file, return_meta=True)
+    save_parquet_with_metadata(df, { 'data': meta, 'build': { 'fingerprint': fingerprint } }, out_file)
+    return out_file
+
+# Build all out-of-date targets under path, running independent ones in parallel worker processes
+# progress (f.e. print) is called with the path of each output file as its build starts
+# Returns the list of meta files that were (or with dry_run, would be) built
+def build_metas(path='.', jobs=None, force=False, dry_run=False, progress=None):
+    targets = discover_build_targets(path)
+    fps = build_fingerprints(targets)
+
+    def up_to_date(t):
+        if force or not os.path.exists(targets[t]['out']): return False
+        bmeta = (load_parquet_metadata(targets[t]['out']) or {}).get('build',{})
+        return bmeta.get('fingerprint') == fps[t]
+    stale = [ t for t in targets if not up_to_date(t) ]
+    if dry_run or not stale: return stale
+
+    done, pending, running = set(targets)-set(stale), set(stale), {}
+    ready = lambda: sorted(t for t in pending if all(d in done for d in targets[t]['deps']))
+    if jobs == 1: # Build in this process, which is easier to debug
+        while pending:
+            for t in ready():
+                if progress: progress(targets[t]['out'])
+                build_target(t,targets[t]['out'],fps[t])
+                pending.remove(t); done.add(t)
+        return stale
+
+    with ProcessPoolExecutor(jobs) as ex:
+        while pending or running:
+            for t in ready():
+                if progress: progress(targets[t]['out'])
+                pending.remove(t); running[ex.submit(build_target,t,targets[t]['out'],fps[t])] = t
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for f in finished:
+                f.result() # Re-raise errors from the worker
+                done.add(running.pop(f))
+    return stale
+
+# Command line entry point (stk_build)
+def build_cli():
+    parser = argparse.ArgumentParser(description='Build parquet files for all meta files in a directory')
+    parser.add_argument('path', nargs='?', default='.', help='Directory to search for meta files')
+    parser.add_argument('-j','--jobs', type=int, default=None, help='Number of worker processes (default: number of cpus)')
+    parser.add_argument('-f','--force', action='store_true', help='Rebuild targets even if they are up to date')
+    parser.add_argument('-n','--dry-run', action='store_true', help='Only list the targets that would be built')
+    args = parser.parse_args()
+    
+    stale = build_metas(args.path, jobs=args.jobs, force=args.force, dry_run=args.dry_run,
+                        progress=lambda out: print(f"Building {os.path.relpath(out)}"))
+    if args.dry_run: print('\n'.join(os.path.relpath(t) for t in stale))
+    elif not stale: print("Everything is up to date")
+
+
+# %% ../nbs/01_io.ipynb 30
+# Generate synthetic data following the structure of a meta, i.e. for load tests and benchmarks
+# Marginals come from ref_df (usually the processed real data) when given and are made up otherwise
+# Columns in the same group share a per-respondent latent (with correlation group_corr) so likert answers correlate like real ones
+
+# Describe how to generate a column, or None if it can not be (i.e. free text)
+def synthetic_column_spec(cn, cd, ref, rng):
+    if ref is not None: ref = ref.dropna()
+    if ref is not None and len(ref)==0: ref = None
+
+    if 'categories' in cd or (ref is not None and ref.dtype.name=='category'):
+        cats = cd.get('categories')
+        if not isinstance(cats,list):
+            if ref is not None and ref.dtype.name=='category': cats = list(ref.dtype.categories)
+            elif 'translate' in cd: cats = [ c for c in pd.unique(np.array(list(cd['translate'].values()),dtype='object')) if c is not None ]
+            else: cats = [ f'{cn} {i+1}' for i in range(5) ]
+        if ref is not None: p = ref.astype('object').value_counts().reindex(cats, fill_value=0).to_numpy(float) + 0.5 # Keep rare categories possible
+        else: p = rng.dirichlet(np.full(len(cats),2.0))
+        return { 'kind': 'cat', 'categories': cats, 'ordered': cd.get('ordered',False), 'cp': np.cumsum(p)/p.sum() }
+
+    if cd.get('datetime') or (ref is not None and pd.api.types.is_datetime64_any_dtype(ref)):
+        q = ref.astype('int64').to_numpy() if ref is not None else pd.to_datetime(['2023-01-01','2024-01-01']).asi8
+        return { 'kind': 'datetime', 'q': np.sort(q) }
+
+    if ref is not None and pd.api.types.is_bool_dtype(ref): return { 'kind': 'bool', 'p': ref.mean() }
+    if ref is not None and not pd.api.types.is_numeric_dtype(ref): return None
+    if ref is not None: q = ref.to_numpy(float)
+    elif cn == 'weight': q = rng.lognormal(-0.125,0.5,1000) # Mean 1
+    else: q = np.array([0.0,100.0])
+    return { 'kind': 'num', 'q': np.sort(q), 'dtype': ref.dtype if ref is not None and pd.api.types.is_integer_dtype(ref) else None }
+
+# Map uniform u to values with the marginal distribution given by spec
+def synthetic_column_values(spec, u):
+    if spec['kind'] == 'cat':
+        codes = np.minimum(np.searchsorted(spec['cp'],u), len(spec['categories'])-1)
+        return pd.Categorical.from_codes(codes, categories=spec['categories'], ordered=spec['ordered'])
+    if spec['kind'] == 'bool': return u < spec['p'] # u is uniform, so this keeps the group correlation
+    vals = np.interp(u, np.linspace(0,1,len(spec['q'])), spec['q'])
+    if spec['kind'] == 'datetime': return pd.to_datetime(vals.astype('int64'))
+    return np.round(vals).astype(spec['dtype']) if spec['dtype'] is not None else vals
+
+# Returns the meta for the generated data (with inferred categories filled in) and a generator of dataframe chunks
+# With draws, a 'draw' column cycling through 0..draws-1 is added
+def synthetic_data(meta, n, chunk_size=100000, seed=0, ref_df=None, draws=None, group_corr=0.5):
+    if isinstance(meta,str): meta = cached_json(meta)
+    meta = deepcopy(resolve_constants(meta)) # Inferred categories get written into it
+    rng = np.random.default_rng(seed)
+
+    groups = []
+    for g in meta['structure']:
+        if g.get('virtual'): continue # Computed on load
+        cols = []
+        for tpl in g['columns']:
+            cn, own = (tpl, {}) if isinstance(tpl,str) else (tpl[0], tpl[-1] if isinstance(tpl[-1],dict) else {})
+            cd = {**g.get('scale',{}), **own}
+            cn = cd.get('col_prefix','') + cn
+            spec = synthetic_column_spec(cn, cd, ref_df[cn] if ref_df is not None and cn in ref_df.columns else None, rng)
+            if spec is None: continue
+            if cd.get('categories') == 'infer': (own if own.get('categories') else g['scale'])['categories'] = spec['categories']
+            cols.append((cn,spec))
+        groups.append(cols)
+
+    def chunks():
+        for ci, start in enumerate(range(0,n,chunk_size)):
+            crng, m = np.random.default_rng([seed,ci]), min(chunk_size,n-start)
+            data = {}
+            for cols in groups:
+                z = group_corr*crng.standard_normal(m)
+                for cn, spec in cols:
+                    data[cn] = synthetic_column_values(spec, ndtr(z + np.sqrt(1-group_corr**2)*crng.standard_normal(m)))
+            if draws: data['draw'] = (start + np.arange(m)) % draws
+            yield pd.DataFrame(data, index=pd.RangeIndex(start,start+m))
+    
+    return meta, chunks()
+
+# Stream n synthetic rows to a .parquet (with the meta attached) or .csv file chunk by chunk, so memory use stays bounded
+def write_synthetic_data(meta, n, out_file, chunk_size=100000, **kwargs):
+    smeta, chunks = synthetic_data(meta, n, chunk_size=chunk_size, **kwargs)
+    writer = None
+    try:
+        for ci, chunk in enumerate(chunks):
+            if out_file.endswith('.parquet'):
+                table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+                if writer is None:
+                    table = table.replace_schema_metadata({ custom_meta_key.encode(): json.dumps({ 'data': smeta }).encode(), **table.schema.metadata })
+                    writer = pq.ParquetWriter(out_file, table.schema, compression='GZIP')
+                writer.write_table(table)
+            else: chunk.to_csv(out_file, mode='a' if ci else 'w', header=(ci==0), index=False)
+    finally:
+        if writer is not None: writer.close()
+    return smeta
+
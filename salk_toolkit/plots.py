@@ -1,11 +1,13 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/03_plots.ipynb.
 
 # %% auto 0
-__all__ = ['estimate_legend_columns_horiz_naive', 'estimate_legend_columns_horiz', 'boxplot_vals', 'boxplot_manual', 'columns',
-           'stacked_columns', 'diff_columns', 'massplot', 'make_start_end', 'likert_bars', 'kde_bw', 'kde_1d',
-           'density', 'violin', 'cluster_based_reorder', 'matrix', 'corr_matrix', 'lines', 'draws_to_hdis', 'lines_hdi',
-           'area_smooth', 'likert_aggregate', 'likert_rad_pol', 'barbell', 'geoplot', 'fd_mangle', 'facet_dist',
-           'ordered_population', 'marimekko']
+__all__ = ['estimate_legend_columns_horiz_naive', 'estimate_legend_columns_horiz', 'boxplot_vals', 'lod_input', 'boxplot_lod',
+           'boxplot_manual', 'columns_data', 'columns', 'stacked_columns_data', 'stacked_columns', 'diff_columns',
+           'massplot', 'make_start_end', 'likert_facets', 'likert_bars_data', 'likert_bars', 'kde_bw', 'kde_1d',
+           'gb_n_groups', 'lod_points', 'density_lod', 'density', 'violin_lod', 'violin', 'cluster_based_reorder',
+           'matrix_data', 'matrix', 'corr_matrix_lod', 'corr_matrix', 'lines', 'draws_to_hdis', 'lines_hdi',
+           'area_smooth', 'likert_aggregate', 'likert_rad_pol', 'barbell', 'geoplot', 'fd_mangle', 'facet_dist_lod',
+           'facet_dist', 'ordered_population_lod', 'ordered_population', 'marimekko']
 
 # %% ../nbs/03_plots.ipynb 3
 import json, os, math
@@ -28,7 +30,7 @@ import arviz as az
 
 from salk_toolkit.utils import *
 from salk_toolkit.io import extract_column_meta, read_json
-from salk_toolkit.pp import registry, registry_meta, e2e_plot, stk_plot
+from salk_toolkit.pp import registry, registry_meta, e2e_plot, stk_plot, default_point_budget
 
 from matplotlib import font_manager
 from PIL import ImageFont
@@ -89,16 +91,23 @@ def boxplot_vals(s,extent=1.5):
         'tmax': s[s<q3+extent*(q3-q1)].max()
     },index=['row'])
 
-@stk_plot('boxplots', data_format='longform', draws=True, n_facets=(1,2), priority=50)
+# Plots with a lod get its output from create_plot, which marks it. Called directly on the rows, they reduce them first
+def lod_input(data, lod, **kwargs):
+    return data if data.attrs.get('lod') is lod else lod(data, **kwargs)
+
+# Level of detail: one row of box statistics per group
+def boxplot_lod(data, value_col='value', facets=[], val_format='%', outer_factors=[]):
+    vals = data[value_col]*100 if val_format[-1] == '%' else data[value_col] # Percentages are drawn as numbers, see below
+    return vals.groupby([ data[c] for c in outer_factors+[f['col'] for f in facets[:2] if f is not None] ],observed=True).apply(boxplot_vals).reset_index()
+
+@stk_plot('boxplots', data_format='longform', draws=True, n_facets=(1,2), priority=50, lod=boxplot_lod)
 def boxplot_manual(data, value_col='value', facets=[], val_format='%', width=800, tooltip=[], outer_factors=[]):
     f0, f1 = facets[0], facets[1] if len(facets)>1 else None
 
+    df = lod_input(data, boxplot_lod, value_col=value_col, facets=facets, val_format=val_format, outer_factors=outer_factors)
     if val_format[-1] == '%': # Boxplots being a compound plot, this workaround is needed for axis & tooltips to be proper
-        data[value_col]*=100
         val_format = val_format[:-1]+'f'
 
-    df = data.groupby(outer_factors+[f['col'] for f in facets[:2] if f is not None],observed=True)[value_col].apply(boxplot_vals).reset_index()
-    
     shared = {'y': alt.Y(f'{f0["col"]}:N', title=None, sort=f0['order']),
               **({'yOffset':alt.YOffset(f'{f1["col"]}:N', title=None, sort=f1['order'])} if f1 else {}),
               'tooltip': [ alt.Tooltip(f'{vn}:Q',format=val_format,title=f'{vn[0].upper()+vn[1:]} of {value_col}') for vn in ['min','q1','median','q3','max'] ] + tooltip[1:] }
@@ -139,13 +148,17 @@ def boxplot_manual(data, value_col='value', facets=[], val_format='%', width=800
     return (lower_plot + middle_plot + upper_plot + middle_tick)
 
 # Also create a raw version for the same plot 
-stk_plot('boxplots-raw', data_format="raw", n_facets=(1,2), priority=0)(boxplot_manual)
+stk_plot('boxplots-raw', data_format="raw", n_facets=(1,2), priority=0, lod=boxplot_lod)(boxplot_manual)
 
 # %% ../nbs/03_plots.ipynb 16
-@stk_plot('columns', data_format='longform', draws=False, n_facets=(1,2))
+# Data as the chart embeds it (see spec_data)
+def columns_data(data):
+    return round(data, 3), None
+
+@stk_plot('columns', data_format='longform', draws=False, n_facets=(1,2), spec_data=columns_data)
 def columns(data, value_col='value', facets=[], val_format='%', width=800, tooltip=[]):
     f0, f1 = facets[0], facets[1] if len(facets)>1 else None
-    plot = alt.Chart(round(data, 3), width = 'container' \
+    plot = alt.Chart(columns_data(data)[0], width = 'container' \
     ).mark_bar().encode(
         x=alt.X(
             f'{value_col}:Q',
@@ -165,16 +178,19 @@ def columns(data, value_col='value', facets=[], val_format='%', width=800, toolt
     return plot
 
 # %% ../nbs/03_plots.ipynb 19
-@stk_plot('stacked_columns', data_format='longform', draws=False, nonnegative=True, n_facets=(2,2), agg_fn='sum', args={'normalized':'bool'})
-def stacked_columns(data, value_col='value', facets=[], n_datapoints=1, val_format='%', width=800, normalized=False, tooltip=[]):
-    f0, f1 = facets[0], facets[1]
-    
-    data[value_col] = data[value_col]/n_datapoints
+def stacked_columns_data(data, value_col='value', facets=[], n_datapoints=1):
+    f1 = facets[1]
+    data = data.assign(**{ value_col: data[value_col]/n_datapoints })
     
     ldict = dict(zip(f1["order"], range(len(f1["order"]))))
     data['f_order'] = data[f1["col"]].astype('object').replace(ldict).astype('int')
+    return round(data, 3), None
+
+@stk_plot('stacked_columns', data_format='longform', draws=False, nonnegative=True, n_facets=(2,2), agg_fn='sum', args={'normalized':'bool'}, spec_data=stacked_columns_data)
+def stacked_columns(data, value_col='value', facets=[], n_datapoints=1, val_format='%', width=800, normalized=False, tooltip=[]):
+    f0, f1 = facets[0], facets[1]
     
-    plot = alt.Chart(round(data, 3), width = 'container' \
+    plot = alt.Chart(stacked_columns_data(data, value_col, facets, n_datapoints)[0], width = 'container' \
     ).mark_bar().encode(
         x=alt.X(
             f'{value_col}:Q',
@@ -206,7 +222,7 @@ def diff_columns(data, value_col='value', facets=[], val_format='%', sort_descen
     idf = data.set_index(ind_cols)
     diff = (idf[idf[f1["col"]]==factors[1]][value_col]-idf[idf[f1["col"]]==factors[0]][value_col]).reset_index()
     
-    if sort_descending: f0["order"] = list(diff.sort_values(value_col,ascending=False)[f0["col"]])
+    if sort_descending: f0 = { **f0, "order": list(diff.sort_values(value_col,ascending=False)[f0["col"]]) }
     
     plot = alt.Chart(round(diff, 3), width = 'container' \
     ).mark_bar().encode(
@@ -233,7 +249,7 @@ def diff_columns(data, value_col='value', facets=[], val_format='%', sort_descen
 def massplot(data, value_col='value', facets=[], n_datapoints=1, val_format='%', width=800, tooltip=[]):
     f0, f1 = facets[0], facets[1] if len(facets)>1 else None
 
-    data['group_size']=(data['group_size']/n_datapoints)#.round(2)
+    data = data.assign(group_size=data['group_size']/n_datapoints)#.round(2)
 
     plot = alt.Chart(round(data, 3), width = 'container' \
     ).mark_circle().encode(
@@ -290,18 +306,26 @@ def make_start_end(x,value_col,cat_col,cat_order):
     #print(res)
     return res
 
-@stk_plot('likert_bars', data_format='longform', draws=False, requires=[{'likert':True}], n_facets=(1,3), sort_numeric_first_facet=True, priority=50)
+# First facet is likert, second is labeled question, third is offset. Creates a dummy question facet if needed
+def likert_facets(facets):
+    if len(facets)==1: return facets + [{ 'col': 'question', 'order': [facets[0]['col']], 'colors': alt.Undefined }]
+    return facets
+
+def likert_bars_data(data, value_col='value', facets=[], outer_factors=[]):
+    if len(facets)==1: data = data.assign(question=facets[0]['col'])
+    facets = likert_facets(facets)
+    gb_cols = outer_factors+[f["col"] for f in facets[1:]] # There can be other extra cols (like labels) that should be ignored
+    options_cols = list(data[facets[0]["col"]].dtype.categories) # Get likert scale names
+    bar_data = data.groupby(gb_cols, group_keys=False, observed=False)[data.columns].apply(make_start_end, value_col=value_col,cat_col=facets[0]["col"],cat_order=facets[0]["order"],include_groups=False)
+    return bar_data, None
+
+@stk_plot('likert_bars', data_format='longform', draws=False, requires=[{'likert':True}], n_facets=(1,3), sort_numeric_first_facet=True, priority=50, spec_data=likert_bars_data)
 def likert_bars(data, value_col='value', facets=[],  tooltip=[], outer_factors=[]):
-    # First facet is likert, second is labeled question, third is offset. Second is better for question which usually goes last, hence reorder
-    if len(facets)==1: # Create a dummy second facet
-        facets.append({ 'col': 'question', 'order': [facets[0]['col']], 'colors': alt.Undefined })
-        data['question'] = facets[0]['col']
+    bar_data = likert_bars_data(data, value_col, facets, outer_factors)[0]
+    # Second facet is better for question which usually goes last, hence reorder
+    facets = likert_facets(facets)
     if len(facets)>=3: f0, f1, f2 = facets[0], facets[2], facets[1]
     elif len(facets)==2: f0, f1, f2 = facets[0], facets[1], None
-
-    gb_cols = outer_factors+[f["col"] for f in facets[1:]] # There can be other extra cols (like labels) that should be ignored
-    options_cols = list(data[f0["col"]].dtype.categories) # Get likert scale names
-    bar_data = data.groupby(gb_cols, group_keys=False, observed=False)[data.columns].apply(make_start_end, value_col=value_col,cat_col=f0["col"],cat_order=f0["order"],include_groups=False)
     
     plot = alt.Chart(bar_data).mark_bar() \
         .encode(
@@ -336,21 +360,34 @@ def kde_1d(vc, value_col, ls, scale=False):
     if scale: y*=len(vc)
     return pd.DataFrame({'density': y, value_col: ls})
 
-@stk_plot('density', data_format='raw', factor_columns=3, aspect_ratio=(1.0/1.0), n_facets=(0,1), args={'stacked':'bool'}, no_question_facet=True)
-def density(data, value_col='value', facets=[], tooltip=[], outer_factors=[], stacked=False, width=800):
-    f0 = facets[0] if len(facets)>0 else None
+# Number of groups gb_in_apply makes over gb_cols (it keeps unobserved category combinations)
+def gb_n_groups(data, gb_cols):
+    return int(np.prod([ len(data[c].dtype.categories) if data[c].dtype.name=='category' else data[c].nunique() for c in gb_cols ]))
+
+# Points per group so that all groups fit in the point budget, capped at the resolution the plot would use anyway
+def lod_points(point_budget, n_groups, max_points, min_points=10):
+    return int(min(max_points, max(min_points, point_budget//max(n_groups,1))))
+
+# Level of detail: densities of each group on a shared grid, as fine as the point budget allows
+def density_lod(data, value_col='value', facets=[], outer_factors=[], stacked=False, point_budget=default_point_budget):
     gb_cols = [ c for c in outer_factors+[f['col'] for f in facets] if c is not None ] # There can be other extra cols (like labels) that should be ignored
     
-    ls = np.linspace(data[value_col].min()-1e-10,data[value_col].max()+1e-10,200)
+    ls = np.linspace(data[value_col].min()-1e-10,data[value_col].max()+1e-10,lod_points(point_budget,gb_n_groups(data,gb_cols),200))
     ndata = gb_in_apply(data,gb_cols,cols=[value_col],fn=kde_1d,value_col=value_col,ls=ls,scale=stacked).reset_index()
+    if stacked: ndata['density'] /= len(data)
+    return ndata
+
+@stk_plot('density', data_format='raw', factor_columns=3, aspect_ratio=(1.0/1.0), n_facets=(0,1), args={'stacked':'bool'}, no_question_facet=True, lod=density_lod)
+def density(data, value_col='value', facets=[], tooltip=[], outer_factors=[], stacked=False, width=800):
+    f0 = facets[0] if len(facets)>0 else None
+    ndata = lod_input(data, density_lod, value_col=value_col, facets=facets, outer_factors=outer_factors, stacked=stacked)
 
     if stacked:
         
         if f0:
             ldict = dict(zip(f0["order"], reversed(range(len(f0["order"])))))
-            ndata.loc[:,'order'] = ndata[f0["col"]].astype('object').replace(ldict).astype('int')
+            ndata = ndata.assign(order=ndata[f0["col"]].astype('object').replace(ldict).astype('int'))
         
-        ndata['density'] /= len(data)
         plot=alt.Chart(ndata).mark_area(interpolate='natural').encode(
                 x=alt.X(f"{value_col}:Q"),
                 y=alt.Y('density:Q',axis=alt.Axis(title=None, format = '%'),stack='zero'),
@@ -368,20 +405,25 @@ def density(data, value_col='value', facets=[], tooltip=[], outer_factors=[], st
             )
     return plot
 
-# %% ../nbs/03_plots.ipynb 31
-@stk_plot('violin', data_format='raw', n_facets=(1,2), as_is=True)
-def violin(data, value_col='value', facets=[], tooltip=[], outer_factors=[],width=800):
-    f0, f1 = facets[0], facets[1] if len(facets)>1 else None
+# %% ../nbs/03_plots.ipynb 32
+# Level of detail: group densities scaled by group size, on a shared grid as fine as the point budget allows
+def violin_lod(data, value_col='value', facets=[], outer_factors=[], point_budget=default_point_budget):
     gb_cols = outer_factors + [ f['col'] for f in facets ] # There can be other extra cols (like labels) that should be ignored
     
-    ls = np.linspace(data[value_col].min()-1e-10,data[value_col].max()+1e-10,200)
+    ls = np.linspace(data[value_col].min()-1e-10,data[value_col].max()+1e-10,lod_points(point_budget,gb_n_groups(data,gb_cols),200))
     ndata = gb_in_apply(data,gb_cols,cols=[value_col],fn=kde_1d,value_col=value_col,ls=ls,scale=True).reset_index()
+    ndata['density'] /= len(data)
+    return ndata
+
+@stk_plot('violin', data_format='raw', n_facets=(1,2), as_is=True, lod=violin_lod)
+def violin(data, value_col='value', facets=[], tooltip=[], outer_factors=[],width=800):
+    f0, f1 = facets[0], facets[1] if len(facets)>1 else None
+    ndata = lod_input(data, violin_lod, value_col=value_col, facets=facets, outer_factors=outer_factors)
     
     if f1:
         ldict = dict(zip(f1["order"], reversed(range(len(f1["order"])))))
-        ndata.loc[:,'order'] = ndata[f1["col"]].astype('object').replace(ldict).astype('int')
+        ndata = ndata.assign(order=ndata[f1["col"]].astype('object').replace(ldict).astype('int'))
 
-    ndata['density'] /= len(data)
     plot=alt.Chart(ndata).mark_area(interpolate='natural').encode(
             x=alt.X(f"{value_col}:Q"),
             y=alt.Y('density:Q',axis=alt.Axis(title=None, labels=False, values=[0], grid=False),stack='center'),
@@ -394,33 +436,40 @@ def violin(data, value_col='value', facets=[], tooltip=[], outer_factors=[],widt
 
     return plot
 
-# %% ../nbs/03_plots.ipynb 33
+# %% ../nbs/03_plots.ipynb 34
 # Cluster-based reordering
 def cluster_based_reorder(X):
     pd = sp.spatial.distance.pdist(X)#,metric='cosine')
     return hierarchy.leaves_list(hierarchy.optimal_leaf_ordering(hierarchy.ward(pd), pd))
 
-@stk_plot('matrix', data_format='longform', aspect_ratio=(1/0.8), n_facets=(2,2), args={'reorder':'bool', 'log_colors':'bool'})
-def matrix(data, value_col='value', facets=[], val_format='%', reorder=False, log_colors=False, tooltip=[]):
+# Data with the color scale column, and the scale column, the sign of its range and any reordering as the key
+# The largest absolute value is passed in as the matrix_dmax param, so templates are reused when only the values change
+def matrix_data(data, value_col='value', facets=[], reorder=False, log_colors=False):
     f0, f1 = facets[0], facets[1]
     
-    fcols = [c for c in data.columns if c not in [value_col,f0["col"]]]
+    fcols, orders = [c for c in data.columns if c not in [value_col,f0["col"]]], None
     if len(fcols)==1 and reorder: # Reordering only works if no external facets
         X = data.pivot(columns=f1["col"],index=f0["col"]).to_numpy()
-        f0["order"] = np.array(f0["order"])[cluster_based_reorder(X)]
-        f1["order"] = np.array(f1["order"])[cluster_based_reorder(X.T)]
+        orders = (tuple(np.array(f0["order"])[cluster_based_reorder(X)]), tuple(np.array(f1["order"])[cluster_based_reorder(X.T)]))
     
     if log_colors:
-        data['val_log'] = np.log(data[value_col])
-        data['val_log'] -= data['val_log'].min() # Keep it all positive 
+        val_log = np.log(data[value_col])
+        data = data.assign(val_log=val_log-val_log.min()) # Keep it all positive 
         scale_v = 'val_log'
     else: scale_v = value_col
+    mi, ma = float(data[scale_v].min()), float(data[scale_v].max())
+    return data, (scale_v, mi<0, orders), { 'matrix_dmax': max(-mi,ma) }
 
-    # Find max absolute value to keep color scale symmetric
-    mi, ma = data[scale_v].min(),data[scale_v].max() 
-    dmax = max(-mi,ma)
+@stk_plot('matrix', data_format='longform', aspect_ratio=(1/0.8), n_facets=(2,2), args={'reorder':'bool', 'log_colors':'bool'}, spec_data=matrix_data)
+def matrix(data, value_col='value', facets=[], val_format='%', reorder=False, log_colors=False, tooltip=[]):
+    f0, f1 = facets[0], facets[1]
+    data, (scale_v, neg, orders), pvals = matrix_data(data, value_col, facets, reorder, log_colors)
+    if orders: f0, f1 = { **f0, "order": list(orders[0]) }, { **f1, "order": list(orders[1]) }
+
+    # Max absolute value keeps the color scale symmetric
+    dmax = alt.param(name='matrix_dmax', value=pvals['matrix_dmax'])
 
-    if mi<0: scale, smid, swidth = { 'scheme':'redyellowgreen', 'domainMid':0, 'domainMin':-dmax, 'domainMax':dmax }, 0, 2*dmax
+    if neg: scale, smid, swidth = { 'scheme':'redyellowgreen', 'domainMid':0, 'domainMin':-dmax, 'domainMax':dmax }, 0, 2*dmax
     else: scale, smid, swidth = { 'scheme': 'yellowgreen', 'domainMin': 0, 'domainMax':dmax }, 0, 2*dmax, #dmax/2, dmax 
 
     # Draw colored boxes
@@ -429,7 +478,7 @@ def matrix(data, value_col='value', facets=[], val_format='%', reorder=False, lo
             y=alt.Y(f'{f0["col"]}:N', title=None, sort=f0["order"]),
             color=alt.Color(f'{scale_v}:Q', scale=alt.Scale(**scale), legend=(alt.Legend(title=None) if not log_colors else None) ),
             tooltip=tooltip,
-        )
+        ).add_params(dmax)
     
     # Add in numerical values
     if len(f1["order"])<20: # only if we have less than 20 columns
@@ -446,19 +495,21 @@ def matrix(data, value_col='value', facets=[], val_format='%', reorder=False, lo
         
     return plot
 
-# %% ../nbs/03_plots.ipynb 37
-@stk_plot('corr_matrix', data_format='raw', aspect_ratio=(1/0.8), n_facets=(1,1))
-def corr_matrix(data, value_col='value', facets=[], val_format='%', reorder=False, tooltip=[]):
-    print(data.columns)
+# %% ../nbs/03_plots.ipynb 38
+# Level of detail: the correlation matrix in long form
+def corr_matrix_lod(data, value_col='value', facets=[]):
     if 'id' not in data.columns: raise Exception("Corr_matrix only works for groups of continuous variables")
     cm = data.pivot_table(index='id',columns=facets[0]['col'],values=value_col,observed=False).corr().reset_index(names='index')
-    cm_long = cm.melt(id_vars=['index'],value_vars=cm.columns, var_name=facets[0]['col'], value_name=value_col)
-    
-    return matrix(cm_long, value_col=value_col, facets=[{'col':'index','order':facets[0]['order']},{'col':facets[0]['col'],'order':facets[0]['order']}], val_format=val_format,
+    return cm.melt(id_vars=['index'],value_vars=cm.columns, var_name=facets[0]['col'], value_name=value_col)
+
+@stk_plot('corr_matrix', data_format='raw', aspect_ratio=(1/0.8), n_facets=(1,1), lod=corr_matrix_lod)
+def corr_matrix(data, value_col='value', facets=[], val_format='%', reorder=False, tooltip=[]):
+    data = lod_input(data, corr_matrix_lod, value_col=value_col, facets=facets)
+    return matrix(data, value_col=value_col, facets=[{'col':'index','order':facets[0]['order']},{'col':facets[0]['col'],'order':facets[0]['order']}], val_format=val_format,
                   tooltip=[alt.Tooltip(f'{value_col}:Q'),alt.Tooltip('index:N'),alt.Tooltip(f"{facets[0]['col']}:N")])
 
-# %% ../nbs/03_plots.ipynb 39
-@stk_plot('lines',data_format='longform', draws=False, requires=[{},{'ordered':True}], n_facets=(2,2), args={'smooth':'bool'})
+# %% ../nbs/03_plots.ipynb 40
+@stk_plot('lines',data_format='longform', draws=False, requires=[{},{'ordered':True}], n_facets=(2,2), args={'smooth':'bool'}, spec_data=True)
 def lines(data, value_col='value', facets=[], smooth=False, width=800, tooltip=[], val_format='.2f',):
     f0, f1 = facets[0], facets[1]
     if smooth:
@@ -476,7 +527,7 @@ def lines(data, value_col='value', facets=[], smooth=False, width=800, tooltip=[
     )
     return plot
 
-# %% ../nbs/03_plots.ipynb 41
+# %% ../nbs/03_plots.ipynb 42
 def draws_to_hdis(data,vc,hdi_vals):
     gbc = [ c for c in data.columns if c not in [vc,'draw'] ]
     ldfs = []
@@ -517,12 +568,12 @@ def lines_hdi(data, value_col='value', facets=[], width=800, tooltip=[], val_for
         )
     return plot
 
-# %% ../nbs/03_plots.ipynb 43
+# %% ../nbs/03_plots.ipynb 44
 @stk_plot('area_smooth',data_format='longform', draws=False, nonnegative=True, requires=[{},{'ordered':True}], n_facets=(2,2))
 def area_smooth(data, value_col='value', facets=[], width=800, tooltip=[]):
     f0, f1 = facets[0], facets[1]
     ldict = dict(zip(f0["order"], range(len(f0["order"]))))
-    data.loc[:,'order'] = data[f0["col"]].astype('object').replace(ldict).astype('int')
+    data = data.assign(order=data[f0["col"]].astype('object').replace(ldict).astype('int'))
     plot=alt.Chart(data
         ).mark_area(interpolate='natural').encode(
             x=alt.X(f'{f1["col"]}:O', title=None, sort=f1["order"]),
@@ -538,7 +589,7 @@ def area_smooth(data, value_col='value', facets=[], width=800, tooltip=[]):
         )
     return plot
 
-# %% ../nbs/03_plots.ipynb 45
+# %% ../nbs/03_plots.ipynb 46
 def likert_aggregate(x, cat_col, cat_order, value_col):
     
     cc, vc = x[cat_col], x[value_col]
@@ -587,7 +638,7 @@ def likert_rad_pol(data, value_col='value', facets=[], normalized=True, width=80
         )
     return plot
 
-# %% ../nbs/03_plots.ipynb 47
+# %% ../nbs/03_plots.ipynb 48
 @stk_plot('barbell', data_format='longform', draws=False, n_facets=(2,2))
 def barbell(data, value_col='value', facets=[], n_datapoints=1, val_format='%', width=800, tooltip=[]):
     f0, f1 = facets[0], facets[1]
@@ -621,7 +672,7 @@ def barbell(data, value_col='value', facets=[], n_datapoints=1, val_format='%',
     
     return chart
 
-# %% ../nbs/03_plots.ipynb 50
+# %% ../nbs/03_plots.ipynb 51
 @stk_plot('geoplot', data_format='longform', n_facets=(1,1), requires=[{'topo_feature':'pass'}], aspect_ratio=(4.0/3.0), no_question_facet=True)
 def geoplot(data, topo_feature, value_col='value', facets=[], val_format='.2f',tooltip=[]):
     f0 = facets[0]
@@ -651,7 +702,7 @@ def geoplot(data, topo_feature, value_col='value', facets=[], val_format='.2f',t
     ).project('mercator')
     return plot
 
-# %% ../nbs/03_plots.ipynb 54
+# %% ../nbs/03_plots.ipynb 55
 # Assuming ns is ordered by unique row values, find the split points
 def split_ordered(cvs):
     if len(cvs.shape)==1: cvs = cvs[:,None]
@@ -667,7 +718,7 @@ def split_even_weight(ws, n):
     cws = (cws/(cws[-1]/n)).astype('int')
     return (split_ordered(cws)+1)[:-1]
 
-# %% ../nbs/03_plots.ipynb 56
+# %% ../nbs/03_plots.ipynb 57
 def fd_mangle(vc, value_col, factor_col, n_points=10): 
     
     vc = vc.sort_values(value_col)
@@ -684,12 +735,17 @@ def fd_mangle(vc, value_col, factor_col, n_points=10):
     df['percentile'] = np.linspace(0,1,n_points)
     return df.melt(id_vars='percentile',value_vars=cats,var_name=factor_col,value_name='density')
 
-@stk_plot('facet_dist', data_format='raw', factor_columns=3,aspect_ratio=(1.0/1.0), n_facets=(1,1), no_question_facet=True)
-def facet_dist(data, value_col='value',facets=[], tooltip=[], outer_factors=[]):
+# Level of detail: category shares along the percentiles of each group, with a point per category and percentile
+def facet_dist_lod(data, value_col='value', facets=[], outer_factors=[], point_budget=default_point_budget):
     f0 = facets[0]
     gb_cols = [ c for c in outer_factors if c is not None ] # There can be other extra cols (like labels) that should be ignored
-    ndata = gb_in_apply(data,gb_cols,cols=[value_col,f0["col"]],fn=fd_mangle,value_col=value_col,factor_col=f0["col"]).reset_index()
-    plot=alt.Chart(ndata).mark_area(interpolate='natural').encode(
+    n_points = lod_points(point_budget//max(len(f0['order']),1),gb_n_groups(data,gb_cols),10,2)
+    return gb_in_apply(data,gb_cols,cols=[value_col,f0["col"]],fn=fd_mangle,value_col=value_col,factor_col=f0["col"],n_points=n_points).reset_index()
+
+@stk_plot('facet_dist', data_format='raw', factor_columns=3,aspect_ratio=(1.0/1.0), n_facets=(1,1), no_question_facet=True, lod=facet_dist_lod)
+def facet_dist(data, value_col='value',facets=[], tooltip=[], outer_factors=[]):
+    f0, data = facets[0], lod_input(data, facet_dist_lod, value_col=value_col, facets=facets, outer_factors=outer_factors)
+    plot=alt.Chart(data).mark_area(interpolate='natural').encode(
             x=alt.X(f"percentile:Q",axis=alt.Axis(format='%')),
             y=alt.Y('density:Q',axis=alt.Axis(title=None, format = '%'),stack='normalize'),
             tooltip = tooltip[1:],
@@ -699,7 +755,7 @@ def facet_dist(data, value_col='value',facets=[], tooltip=[], outer_factors=[]):
 
     return plot
 
-# %% ../nbs/03_plots.ipynb 58
+# %% ../nbs/03_plots.ipynb 59
 # Vectorized multinomial sampling. Should be slightly faster
 def vectorized_mn(prob_matrix):
     s = prob_matrix.cumsum(axis=1)
@@ -745,12 +801,12 @@ def linevals(vals, value_col, n_points, dim, cats, ccodes=None, ocols=None, boos
 
     return pdf
 
-# %% ../nbs/03_plots.ipynb 59
-@stk_plot('ordered_population', data_format='raw', factor_columns=3, aspect_ratio=(1.0/1.0), plot_args={'group_categories':'bool'}, n_facets=(0,1), no_question_facet=True)
-def ordered_population(data, value_col='value', facets=[], tooltip=[], outer_factors=[], group_categories=False):
+# %% ../nbs/03_plots.ipynb 60
+# Level of detail: each group ordered by value and cut into as many points as the point budget allows
+def ordered_population_lod(data, value_col='value', facets=[], outer_factors=[], group_categories=False, point_budget=default_point_budget):
     f0 = facets[0] if len(facets)>0 else None
     
-    n_points, maxn = 200, 1000000
+    maxn = 1000000
     
      # TODO: use weight if available. linevals is ready for it, just needs to be fed in. 
     
@@ -775,6 +831,7 @@ def ordered_population(data, value_col='value', facets=[], tooltip=[], outer_fac
         # Assume data is sorted by outer_factors, split vals into groups by them
         ofids = np.stack([ data[f].cat.codes.values for f in outer_factors ],axis=1)
         splits = split_ordered(ofids)        
+        n_points = lod_points(point_budget,len(splits)+1,200)
         groups = np.split(vals,splits)
         cgroups = np.split(cat_idx,splits) if len(facets)>=1 else groups
         
@@ -785,11 +842,18 @@ def ordered_population(data, value_col='value', facets=[], tooltip=[], outer_fac
 
         #tdf = data.groupby(outer_factors,observed=True).apply(linevals,value_col=value_col,dim=fcol,cats=cats,n_points=n_points,gc=group_categories,include_groups=False).reset_index()
     else:
+        n_points = lod_points(point_budget,1,200)
         tdf = linevals(vals,value_col=value_col,dim=fcol,ccodes=cat_idx,cats=cats,n_points=n_points, gc=group_categories)
         #tdf = linevals(data,value_col=value_col,cats=cats,dim=fcol,n_points=n_points,gc=group_categories)
         
     #if boost_signal:
     #    tdf['matches'] = np.minimum(tdf['matches'],tdf['kld']/tdf['kld'].quantile(0.75))
+    return tdf
+
+@stk_plot('ordered_population', data_format='raw', factor_columns=3, aspect_ratio=(1.0/1.0), plot_args={'group_categories':'bool'}, n_facets=(0,1), no_question_facet=True, lod=ordered_population_lod)
+def ordered_population(data, value_col='value', facets=[], tooltip=[], outer_factors=[], group_categories=False):
+    f0 = facets[0] if len(facets)>0 else None
+    tdf = lod_input(data, ordered_population_lod, value_col=value_col, facets=facets, outer_factors=outer_factors, group_categories=group_categories)
 
     base = alt.Chart(tdf).encode(
         x=alt.X('pos:Q',
@@ -828,7 +892,7 @@ def ordered_population(data, value_col='value', facets=[], tooltip=[], outer_fac
     )
     return plot
 
-# %% ../nbs/03_plots.ipynb 61
+# %% ../nbs/03_plots.ipynb 63
 @stk_plot('marimekko', data_format='longform', draws=False, group_sizes=True, args={'separate':'bool'}, n_facets=(2,2))
 def marimekko(data, value_col='value', facets=[], val_format='%', width=800, tooltip=[], outer_factors=[], separate=False):
     f0, f1 = facets[0], facets[1]
@@ -836,8 +900,7 @@ def marimekko(data, value_col='value', facets=[], val_format='%', width=800, too
     #xcol, ycol, ycol_scale = f1["col"], f0["col"], f0["colors"]
     xcol, ycol, ycol_scale = f0["col"], f1["col"], f1["colors"]
      
-    data['w'] = data['group_size']*data[value_col]
-    data.sort_values([xcol,ycol],ascending=[True,False],inplace=True)
+    data = data.assign(w=data['group_size']*data[value_col]).sort_values([xcol,ycol],ascending=[True,False])
 
     if separate: # Split and center each ycol group so dynamics can be better tracked for all of them
         ndata = data.groupby(outer_factors+[xcol],observed=False)[[ycol,value_col,'w']].apply(lambda df: pd.DataFrame({ ycol: df[ycol], 'yv': df['w']/df['w'].sum(), 'w': df['w']})).reset_index()
@@ -1,19 +1,37 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/02_pp.ipynb.
 
 # %% auto 0
-__all__ = ['registry', 'registry_meta', 'stk_plot_defaults', 'n_a', 'priority_weights', 'cont_transform_options',
-           'special_columns', 'internal_columns', 'get_cat_num_vals', 'stk_plot', 'stk_deregister', 'get_plot_fn',
-           'get_plot_meta', 'get_all_plots', 'calculate_priority', 'matching_plots', 'get_filtered_data',
-           'translate_df', 'create_plot', 'impute_factor_cols', 'e2e_plot', 'test_new_plot']
+__all__ = ['registry', 'registry_meta', 'stk_plot_defaults', 'default_point_budget', 'local_plots', 'n_a', 'priority_weights',
+           'current_trace', 'trace_depth', 'cont_transform_options', 'memo_lock', 'filter_index_memo',
+           'stats_quantiles', 'column_stats_memo', 'data_cube_memo', 'special_columns', 'parquet_batch_rows',
+           'result_cache', 'data_fingerprint_memo', 'internal_columns', 'translate_fn_memo', 'spec_templates',
+           'max_spec_templates', 'spec_templates_lock', 'get_cat_num_vals', 'stk_plot', 'stk_deregister', 'get_plot_fn',
+           'get_plot_meta', 'plot_names', 'get_all_plots', 'calculate_priority', 'frame_columns', 'matching_plots',
+           'PlotTrace', 'plot_trace', 'trace_span', 'data_rows', 'traced_stage', 'weak_memo', 'FilterIndex',
+           'get_filter_index', 'compute_column_stats', 'column_stats', 'filter_values', 'DataCube', 'build_data_cube',
+           'get_data_cube', 'lazy_filter_values', 'lazy_filter', 'restore_categoricals', 'lazy_collect',
+           'trim_categories', 'strip_question_prefix', 'parquet_value_range', 'parquet_scan_range',
+           'parquet_filtered_data', 'needed_columns', 'filter_mask', 'get_filtered_data', 'ResultCache',
+           'data_fingerprint', 'compute_fingerprint', 'canonical_pp_desc', 'stable_key_default', 'result_cache_key',
+           'cached_filtered_data', 'memoize_translate', 'translate_dtype', 'translate_df', 'plot_spec', 'data_refs',
+           'create_plot', 'impute_factor_cols', 'prepare_pp_desc', 'e2e_plot', 'e2e_plots', 'test_new_plot']
 
 # %% ../nbs/02_pp.ipynb 3
-import json, os
+import json, os, re, glob, weakref, time, threading
 import itertools as it
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from hashlib import sha256
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from contextvars import ContextVar, copy_context
 
 import numpy as np
 import pandas as pd
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import datetime as dt
 import scipy.stats as sps
 
@@ -22,48 +40,64 @@ from typing import List, Tuple, Dict, Union, Optional
 import altair as alt
 
 from salk_toolkit.utils import *
-from salk_toolkit.io import load_parquet_with_metadata, extract_column_meta, group_columns_dict, list_aliases, read_annotated_data, read_json
+from salk_toolkit.io import load_parquet_with_metadata, load_parquet_metadata, save_parquet_with_metadata, extract_column_meta, group_columns_dict, list_aliases, read_annotated_data, read_json, get_meta_index
 
 # %% ../nbs/02_pp.ipynb 6
 # Augment each draw with bootstrap data from across whole population to make sure there are at least <threshold> samples
-def augment_draws(data, factors=None, n_draws=None, threshold=50):
+# Done in one vectorized pass: per-(cell,draw) deficits from a count matrix, all resample indices drawn at once, one concat
+def augment_draws(data, factors=None, n_draws=None, threshold=50, seed=None):
     if n_draws == None: n_draws = data.draw.max()+1
-    
-    if factors: # Run recursively on each factor separately and concatenate results
-        if data[ ['draw']+factors ].value_counts().min() >= threshold: return data # This takes care of large datasets fast
-        return data.groupby(factors,observed=False).apply(augment_draws,n_draws=n_draws,threshold=threshold).reset_index(drop=True) # Slow-ish, but only needed on small data now
-    
-    # Get count of values for each draw
-    draw_counts = data['draw'].value_counts() # Get value counts of existing draws
-    if len(draw_counts)<n_draws: # Fill in completely missing draws
-        draw_counts = (draw_counts + pd.Series(0,index=range(n_draws))).fillna(0).astype(int)
-        
-    # If no new draws needed, just return original
-    if draw_counts.min()>=threshold: return data
-    
-    # Generate an index for new draws
-    new_draws = [ d for d,c in draw_counts[draw_counts<threshold].items() for _ in range(threshold-c) ]
+    if factors and data[ ['draw']+factors ].value_counts().min() >= threshold: return data # This takes care of large datasets fast
+
+    # Cell code for each row (rows with missing factor values are dropped, as groupby would)
+    cell = data.groupby(factors,observed=True,sort=True).ngroup().to_numpy() if factors else np.zeros(len(data))
+    valid = ~np.isnan(cell)
+    cell, pos = cell[valid].astype('int64'), np.flatnonzero(valid)
+    draw = data['draw'].to_numpy()[valid].astype('int64')
+    n_cells = cell.max()+1 if len(cell) else 0
+
+    # Deficit of each (cell,draw) pair
+    counts = np.bincount(cell*n_draws+draw, minlength=n_cells*n_draws).reshape(n_cells,n_draws)
+    deficit = np.maximum(threshold-counts,0)
+    if deficit.sum()==0: return data
+
+    # Generate new draws, resampling rows uniformly within their cell
+    new_cell = np.repeat(np.arange(n_cells), deficit.sum(axis=1))
+    new_draw = np.repeat(np.tile(np.arange(n_draws), n_cells), deficit.ravel())
+    order = np.argsort(cell, kind='stable')
+    sizes = np.bincount(cell, minlength=n_cells)
+    rng = np.random.default_rng(seed) if seed is not None else np.random # Global state unless seeded, like before
+    new_pos = pos[order[(np.cumsum(sizes)-sizes)[new_cell] + (rng.random(len(new_cell))*sizes[new_cell]).astype('int64')]]
+
+    if not factors:
+        new_rows = data.iloc[new_pos,:].copy()
+        new_rows['draw'] = new_draw.astype(data['draw'].dtype)
+        return pd.concat([data, new_rows])
+
+    # Keep each cell's original rows followed by its new ones, cells in group order
+    perm = np.argsort(np.concatenate([cell[order], new_cell]), kind='stable')
+    res = data.iloc[np.concatenate([pos[order], new_pos])[perm],:].reset_index(drop=True)
+    res['draw'] = np.concatenate([draw[order], new_draw])[perm].astype(data['draw'].dtype)
+    return res
 
-    # Generate new draws
-    new_rows = data.iloc[np.random.choice(len(data),len(new_draws)),:].copy()
-    new_rows['draw'] = new_draws
-    
-    return pd.concat([data, new_rows])
 
-# %% ../nbs/02_pp.ipynb 7
+# %% ../nbs/02_pp.ipynb 8
 # Get the numerical values to map categories to
 def get_cat_num_vals(res_meta,pp_desc):
     nvals = res_meta.get('num_values',range(len(res_meta['categories'])))
     if 'num_values' in pp_desc: nvals = pp_desc['num_values'] 
     return nvals
 
-# %% ../nbs/02_pp.ipynb 9
+# %% ../nbs/02_pp.ipynb 10
 registry = {}
 registry_meta = {}
 
-# %% ../nbs/02_pp.ipynb 11
+# %% ../nbs/02_pp.ipynb 12
 stk_plot_defaults = { 'data_format': 'longform' }
 
+# Rough bound on the points a plot with a level of detail function (lod) sends to the chart. Overridden by pp_desc 'point_budget'
+default_point_budget = 5000
+
 # Decorator for registering a plot type with metadata
 def stk_plot(plot_name, **r_kwargs):
     
@@ -85,16 +119,26 @@ def stk_deregister(plot_name):
     del registry[plot_name]
     del registry_meta[plot_name]
 
+# Plots registered for the current context only (see test_new_plot), so other threads never see them
+# Maps plot name to (function, meta) and takes precedence over the global registry
+local_plots = ContextVar('local_plots', default={})
+
 def get_plot_fn(plot_name):
-    return registry[plot_name]
+    local = local_plots.get()
+    return local[plot_name][0] if plot_name in local else registry[plot_name]
 
 def get_plot_meta(plot_name):
-    return registry_meta[plot_name].copy()
+    local = local_plots.get()
+    return (local[plot_name][1] if plot_name in local else registry_meta[plot_name]).copy()
+
+# Names of registered plots, in order of registration
+def plot_names():
+    return list(registry.keys()) + [ pn for pn in local_plots.get() if pn not in registry ]
 
 def get_all_plots():
-    return sorted(list(registry.keys()))
+    return sorted(plot_names())
 
-# %% ../nbs/02_pp.ipynb 12
+# %% ../nbs/02_pp.ipynb 13
 # First is weight if not matching, second if match
 # This is very much a placeholder right now
 n_a = -1000000
@@ -142,42 +186,118 @@ def calculate_priority(plot_meta, match):
     return priority, reasons
 
 
+# Column names of a pandas DataFrame, a polars LazyFrame or a pyarrow ParquetFile
+def frame_columns(df):
+    if isinstance(df,pl.LazyFrame): return df.collect_schema().names()
+    elif isinstance(df,pq.ParquetFile): return df.schema_arrow.names
+    else: return list(df.columns)
+
 # Get a list of plot types matching required spec
 def matching_plots(pp_desc, df, data_meta, details=False, list_hidden=False):
-    col_meta = extract_column_meta(data_meta)
+    col_meta = get_meta_index(data_meta).col_meta
     
     rc = pp_desc['res_col']
     rcm = col_meta[rc]
 
     # Determine if values are non-negative
-    cols = [c for c in rcm['columns'] if c in df.columns] if 'columns' in rcm else [rc]
-    nonneg = ('categories' in rcm) or df[cols].min(axis=None)>=0
+    fcols = frame_columns(df)
+    cols = [c for c in rcm['columns'] if c in fcols] if 'columns' in rcm else [rc]
+    if 'categories' in rcm: nonneg = True
+    elif isinstance(df,pl.LazyFrame): nonneg = df.select(pl.min_horizontal(pl.col(cols).min())).collect().item()>=0
+    elif isinstance(df,pq.ParquetFile): nonneg = min( b.to_pandas().min(axis=None) for b in df.iter_batches(columns=cols) )>=0
+    else: nonneg = pd.Series([ column_stats(df,c)['min'] for c in cols ]).min()>=0
     if pp_desc.get('convert_res')=='continuous' and ('categories' in rcm):
         nonneg = min([ v for v in get_cat_num_vals(rcm,pp_desc) if v is not None ])>=0
 
     match = {
-        'draws': ('draw' in df.columns),
+        'draws': ('draw' in fcols),
         'nonnegative': nonneg,
         'hidden': list_hidden,
 
         'res_col': rc,
         'categorical': ('categories' in rcm) and pp_desc.get('convert_res')!='continuous',
-        'facet_metas': [ {'name':cn, **col_meta[cn]} for cn in pp_desc['factor_cols']]
+        'facet_metas': [ {'name':cn, **col_meta.get(cn,{})} for cn in pp_desc['factor_cols']]
     }
     
-    res = [ ( pn, *calculate_priority(get_plot_meta(pn),match)) for pn in registry.keys() ]
+    res = [ ( pn, *calculate_priority(get_plot_meta(pn),match)) for pn in plot_names() ]
     
     if details: return { n: (p, i) for (n, p, i) in res } # Return dict with priorities and failure reasons
     else: return [ n for (n,p,i) in sorted(res,key=lambda t: t[1], reverse=True) if p >= 0 ] # Return list of possibilities in decreasing order of fit
 
-# %% ../nbs/02_pp.ipynb 17
+# %% ../nbs/02_pp.ipynb 18
+# Stage timing for the plot pipeline. Inside a plot_trace, each pipeline stage records a span as a dict of
+# stage, depth (for stages within stages), seconds, rows_in and rows_out, in the order the stages start
+# callback (f.e. logging.getLogger('salk').info) gets each record as its stage finishes
+# Traces are per context (and so per thread), and outside of one the spans do nothing
+class PlotTrace:
+    def __init__(self, callback=None):
+        self.records, self.callback = [], callback
+
+current_trace = ContextVar('current_trace', default=None)
+trace_depth = ContextVar('trace_depth', default=0)
+
+@contextmanager
+def plot_trace(callback=None):
+    trace = PlotTrace(callback)
+    token = current_trace.set(trace)
+    try: yield trace
+    finally: current_trace.reset(token)
+
+# Time the enclosed block as a stage. The yielded record can be given rows_out (or anything else) to report
+@contextmanager
+def trace_span(stage, rows_in=None):
+    trace = current_trace.get()
+    if trace is None: yield {}; return
+    rec = { 'stage': stage, 'depth': trace_depth.get(), 'seconds': None, 'rows_in': rows_in, 'rows_out': None }
+    trace.records.append(rec)
+    token = trace_depth.set(rec['depth']+1)
+    start = time.perf_counter()
+    try: yield rec
+    finally:
+        rec['seconds'] = time.perf_counter()-start
+        trace_depth.reset(token)
+        if trace.callback: trace.callback(rec)
+
+# Rows of a data frame, or of the data in pparams
+def data_rows(x):
+    if isinstance(x,dict): x = x.get('data')
+    return len(x) if isinstance(x,pd.DataFrame) else None
+
+# Decorator to trace a pipeline function as a stage, with the rows of its first argument and of its result
+def traced_stage(stage):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_span(stage, data_rows(args[0]) if args else None) as span:
+                res = fn(*args, **kwargs)
+                span['rows_out'] = data_rows(res)
+            return res
+        return wrapper
+    return decorator
+
+
+# %% ../nbs/02_pp.ipynb 19
 cont_transform_options = ['center','zscore','softmax','softmax-ratio']
 
-# %% ../nbs/02_pp.ipynb 18
+# %% ../nbs/02_pp.ipynb 20
+# Row counts per category of a categorical column, optionally only over the rows selected by a boolean mask
+def category_counts(col, mask=None):
+    codes = col.cat.codes.to_numpy()
+    if mask is not None: codes = codes[mask]
+    return np.bincount(codes[codes>=0], minlength=len(col.dtype.categories))
+
 # Get the categories that are in use
 def get_cats(col, cats=None):
     if cats is None or len(set(col.dtype.categories)-set(cats))>0: cats = col.dtype.categories
-    return [ c for c in cats if c in col.unique() ]
+    present = set(col.dtype.categories[category_counts(col)>0])
+    return [ c for c in cats if c in present ]
+
+# Stack columns one after another, as melt does, but via category codes when they share the same categories
+def stack_columns(df, cols):
+    dtypes = [ df[c].dtype for c in cols ]
+    if dtypes[0].name == 'category' and all( dt == dtypes[0] for dt in dtypes ):
+        return pd.Categorical.from_codes(np.concatenate([ df[c].cat.codes.to_numpy() for c in cols ]), dtype=dtypes[0])
+    return pd.concat([ df[c] for c in cols ], ignore_index=True).values
 
 def transform_cont(data, transform):
     if not transform: return data, '.1f'
@@ -187,100 +307,518 @@ def transform_cont(data, transform):
     elif transform == 'softmax-ratio': return data.shape[1]*np.exp(data)/(np.exp(np.array(data)).sum(axis=1)[:,None]), '.1f' 
     else: raise Exception(f"Unknown transform '{transform}'")
 
-# %% ../nbs/02_pp.ipynb 19
+# %% ../nbs/02_pp.ipynb 22
+# Memoize make(obj) per object, dropping the entry once the object is garbage collected
+# NB! The value must not hold a reference to obj, or it will never be collected
+# make runs outside the lock, so if two threads race, both compute it but both get the value that was stored first
+memo_lock = threading.RLock()
+def weak_memo(memo, obj, make):
+    ref, val = memo.get(id(obj),(None,None))
+    if ref is not None and ref() is obj: return val
+    
+    i, val = id(obj), make(obj)
+    def forget(r): # Unless the id already belongs to a new object
+        if memo.get(i,(None,))[0] is r: memo.pop(i,None)
+    with memo_lock:
+        ref, old = memo.get(i,(None,None))
+        if ref is not None and ref() is obj: return old
+        memo[i] = (weakref.ref(obj, forget), val)
+    return val
+
+# Bitmap index for filtering categorical columns of a dataset
+# Rows of each category are kept as packed bitsets (built lazily from the category codes), so filtering a column
+# is an OR over the bitsets of the chosen categories, and a filter dict an AND over the columns
+# Masks per column are cached, so changing one filter reuses the masks of the others
+class FilterIndex:
+    def __init__(self, n, max_masks=256):
+        self.n, self.max_masks = n, max_masks
+        self.bitsets, self.masks = {}, OrderedDict()
+        self.lock = threading.Lock() # Shared by all plots on the dataset, which may run in parallel
+
+    # Packed mask of rows where categorical column s has one of the values (NA never matches)
+    def mask(self, s, values):
+        cats = s.dtype.categories
+        cis = sorted(set(ci for ci in cats.get_indexer(pd.unique(pd.Series(values,dtype='object'))) if ci>=0))
+        key = (s.name, tuple(cats[cis]))
+        with self.lock:
+            if key in self.masks:
+                self.masks.move_to_end(key)
+                return self.masks[key]
+            
+            m, codes = np.zeros((self.n+7)//8, dtype=np.uint8), None
+            for c in key[1]:
+                if (s.name,c) not in self.bitsets:
+                    if codes is None: codes = s.cat.codes.to_numpy()
+                    self.bitsets[(s.name,c)] = np.packbits(codes==cats.get_loc(c))
+                m |= self.bitsets[(s.name,c)]
+            self.masks[key] = m
+            if len(self.masks) > self.max_masks: self.masks.popitem(last=False)
+            return m
+
+# One index per dataset. As with the result cache, datasets should not be modified in place after use
+filter_index_memo = {}
+def get_filter_index(df):
+    return weak_memo(filter_index_memo, df, lambda df: FilterIndex(len(df)))
+
+# Statistics catalog of a dataset, so ui and plot selection do not rescan full columns on every interaction
+# Computed per column on first use: null count and cardinality, category counts and observed categories for categoricals,
+# and min, max and quantiles for the rest. Subsets can be summarized from the counts via category_counts(col,mask)
+stats_quantiles = [0.05, 0.25, 0.5, 0.75, 0.95]
+def compute_column_stats(s):
+    res = { 'nulls': int(s.isna().sum()) }
+    if s.dtype.name == 'category':
+        counts = category_counts(s)
+        res['counts'] = dict(zip(s.dtype.categories,counts))
+        res['observed'] = list(s.dtype.categories[counts>0])
+        res['cardinality'] = len(res['observed'])
+    else:
+        res.update({ 'min': s.min(), 'max': s.max(), 'cardinality': s.nunique() })
+        if pd.api.types.is_numeric_dtype(s) and s.dtype!='bool': res['quantiles'] = dict(zip(stats_quantiles,s.quantile(stats_quantiles)))
+    return res
+
+column_stats_memo = {}
+def column_stats(df, col):
+    stats = weak_memo(column_stats_memo, df, lambda df: {})
+    if col not in stats: stats[col] = compute_column_stats(df[col])
+    return stats[col]
+
+# Values a filter entry selects, or None if it is a range over a continuous column
+def filter_values(k, v, c_meta):
+    # Range filters have form [None,start,end]
+    is_range = isinstance(v,list) and v[0] is None and len(v)==3
+    kmeta = c_meta.get(k,{})
+    if is_range and (not isinstance(v[1],str) or kmeta.get('continuous') or kmeta.get('datetime')): return None
+    
+    if is_range: # Range of values over ordered categorical
+        if kmeta.get('categories','infer')=='infer': raise Exception(f'Ordering unknown for column {k}')
+        cats = list(kmeta['categories'])
+        if set(v[1:]) & set(cats) != set(v[1:]): raise Exception(f'Column {k} values {v} not found in {cats}')
+        bi, ei = cats.index(v[1]), cats.index(v[2])
+        return cats[bi:ei+1]
+    elif isinstance(v,list): return v # List indicates a set of values
+    elif 'groups' in kmeta and v in kmeta['groups']:
+        return kmeta['groups'][v]
+    else: return [v] # Just filter on single value
+
+
+# %% ../nbs/02_pp.ipynb 24
+# Pre-aggregated weighted counts over chosen categorical columns of a dataset (and draw, if present)
+# get_filtered_data answers pp_descs with a categorical res_col and categorical factors and filters by slicing
+# and summing the cube, so latency does not depend on the number of rows. Anything else falls back to the rows
+# Each categorical dimension has an extra last slot for NA
+# count_col gives row counts when df itself is already aggregated (with weight holding the weight sums)
+# sketch_cols are continuous columns to keep quantile sketches of per cell, for agg_fn like 'median~' (see sketch_level)
+class DataCube:
+    def __init__(self, df, dims, max_cells=5e7, count_col=None, sketch_cols=[]):
+        dims = [ d for d in dims if d!='draw' ] + (['draw'] if 'draw' in df.columns else [])
+        for d in dims:
+            if d!='draw' and df[d].dtype.name!='category': raise Exception(f"Cube dimension {d} is not categorical")
+        
+        self.dims, self.cats, codes = dims, {}, []
+        for d in dims:
+            if d == 'draw':
+                self.cats[d], dc = np.unique(df[d].to_numpy(), return_inverse=True)
+                codes.append((dc, len(self.cats[d])))
+            else:
+                self.cats[d] = df[d].dtype.categories
+                dc = df[d].cat.codes.to_numpy().astype('int64')
+                codes.append((np.where(dc<0, len(self.cats[d]), dc), len(self.cats[d])+1))
+        self.shape = tuple( n for _, n in codes )
+        n_cells = np.prod(self.shape,dtype=float)*(1+sketch_bins*len(sketch_cols))
+        if n_cells > max_cells: raise Exception(f"Cube would have {n_cells:.0f} cells")
+
+        flat = np.zeros(len(df),dtype='int64')
+        for dc, n in codes: flat = flat*n + dc
+        weight = df['weight'].fillna(1.0).to_numpy(float) if 'weight' in df.columns else None
+        size = int(np.prod(self.shape))
+        self.wsum = np.bincount(flat, weights=weight, minlength=size).reshape(self.shape)
+        self.count = np.bincount(flat, weights=(df[count_col].to_numpy(float) if count_col else None), minlength=size).astype('int64').reshape(self.shape)
+        self.draw_dtype = df['draw'].dtype if 'draw' in df.columns else None
+
+        # Sketches have a trailing axis of bins over the value range of the column
+        self.sketches = {}
+        for c in sketch_cols:
+            vals = df[c].to_numpy(float)
+            lo, hi = (np.nanmin(vals), np.nanmax(vals)) if (~np.isnan(vals)).any() else (0.0, 0.0)
+            b = sketch_bin(vals, lo, hi)
+            self.sketches[c] = (lo, hi, np.bincount(flat[b>=0]*sketch_bins + b[b>=0], minlength=size*sketch_bins).reshape(self.shape+(sketch_bins,)))
+
+    # Whether pp_desc is a plain weighted crosstab that counts over categorical columns can answer
+    @staticmethod
+    def applicable(pp_desc, plot_meta, draws_data={}, columns=[]):
+        return not (plot_meta.get('data_format')!='longform' or plot_meta.get('group_sizes') or columns
+            or not pp_desc.get('poststrat',True) or pp_desc.get('convert_res')=='continuous' or 'augment_to' in pp_desc
+            or (plot_meta.get('draws') and pp_desc['res_col'] in draws_data))
+
+    # Same result as get_filtered_data, or None if the cube can not answer the pp_desc
+    def query(self, pp_desc, plot_meta, c_meta, draws_data={}, columns=[]):
+        res_col, flt = pp_desc['res_col'], pp_desc.get('filter',{})
+        draws = plot_meta.get('draws',False)
+        if not self.applicable(pp_desc, plot_meta, draws_data, columns) or (draws and 'draw' not in self.dims): return None
+        
+        gb_dims = (['draw'] if draws else []) + [ c for c in pp_desc.get('factor_cols',[]) if c!=res_col ]
+        qlevel = sketch_level(plot_meta.get('agg_fn',pp_desc.get('agg_fn','mean')))
+        sketch = res_col in self.sketches and qlevel is not None
+        if sketch and pp_desc.get('cont_transform'): return None
+        keep = gb_dims + ([] if sketch else [res_col])
+        if len(set(keep))<len(keep) or 'draw' in flt or any(d not in self.dims for d in keep+list(flt)): return None
+
+        # Slots to sum over along each dimension: the selected categories for filters, everything else otherwise
+        slots = []
+        for d in self.dims:
+            if d in flt:
+                flst = filter_values(d, flt[d], c_meta)
+                if flst is None: return None
+                slots.append(np.array(sorted(set(ci for ci in self.cats[d].get_indexer(pd.unique(pd.Series(flst,dtype='object'))) if ci>=0)),dtype='int64'))
+            else: slots.append(np.arange(self.shape[self.dims.index(d)]))
+        kaxes = [ self.dims.index(d) for d in keep ]
+        other = tuple( i for i in range(len(self.dims)) if i not in kaxes )
+        reduce = lambda a: np.transpose(a[np.ix_(*slots)].sum(axis=other), list(np.argsort(np.argsort(kaxes))) + list(range(len(kaxes),a.ndim-len(other)))) # -> keep order
+        count, wsum = reduce(self.count), reduce(self.wsum)
+
+        # Levels of each kept dimension, as positions along its axis (trimmed to categories present, as in get_filtered_data)
+        levels, pos, cols = [], [], []
+        for i, d in enumerate(keep):
+            present = count.sum(axis=tuple(j for j in range(len(keep)) if j!=i)) > 0
+            spos = { s: j for j, s in enumerate(slots[self.dims.index(d)]) }
+            if d == 'draw':
+                lv = [ self.cats[d][s] for s in spos if present[spos[s]] ]
+                pos.append([ spos[s] for s in spos if present[spos[s]] ])
+            else:
+                dcats = list(self.cats[d])
+                dmeta = c_meta.get(d,{})
+                m_cats = dmeta['categories'] if dmeta.get('categories','infer')!='infer' else None
+                if d == res_col and dmeta.get('likert'): # Do not trim likert as plots need to be symmetric
+                    if m_cats is None or set(dcats)-set(m_cats): return None
+                    lv = list(m_cats)
+                else:
+                    order = dcats if m_cats is None or set(dcats)-set(m_cats) else m_cats
+                    lv = [ c for c in order if c in dcats and dcats.index(c) in spos and present[spos[dcats.index(c)]] ]
+                pos.append([ spos.get(dcats.index(c),-1) if c in dcats else -1 for c in lv ]) # -1 -> zero padding
+            levels.append(lv)
+
+        # Pad every axis with a zero slot at the end, so categories missing from data can point to it
+        pad = lambda a: np.pad(a, [(0,1)]*len(keep) + [(0,0)]*(a.ndim-len(keep))) # Not the bins of sketches
+        take = lambda a: pad(a)[np.ix_(*[ np.array(p,dtype='int64') for p in pos ])]
+        if sketch:
+            lo, hi, sk = self.sketches[res_col]
+            num, value_col = sketch_quantiles(take(reduce(sk)), qlevel, lo, hi), res_col
+        else:
+            num, value_col = take(wsum), 'percent'
+            if plot_meta.get('agg_fn')!='sum':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    num = num / take(np.broadcast_to(wsum.sum(axis=-1,keepdims=True), wsum.shape))
+        
+        idx = np.indices(num.shape).reshape(len(keep),num.size)
+        vals, mask = num.reshape(-1), ~np.isnan(num.reshape(-1))
+        data = {}
+        for i, d in enumerate(keep):
+            if d == 'draw': data[d] = np.array(levels[i],dtype=self.draw_dtype)[idx[i][mask]]
+            else: data[d] = pd.Categorical.from_codes(idx[i][mask], categories=levels[i], ordered=c_meta.get(d,{}).get('ordered',False))
+        data[value_col] = vals[mask]
+
+        if sketch: return { 'value_col': res_col, 'data': pd.DataFrame(data), 'val_format': pp_desc.get('value_format','.1f'), 'n_datapoints': int(count.sum()) }
+        return { 'value_col': 'percent', 'cat_col': res_col, 'data': pd.DataFrame(data),
+                 'val_format': pp_desc.get('value_format','.1%'), 'n_datapoints': int(count.sum()) }
+
+# Build a cube over dims (categorical columns) for df, after which get_filtered_data uses it automatically
+# As with the other per-dataset structures, df should not be modified in place afterwards
+data_cube_memo = {}
+def build_data_cube(df, dims, **kwargs):
+    data_cube_memo.pop(id(df), None)
+    return weak_memo(data_cube_memo, df, lambda df: DataCube(df, dims, **kwargs))
+
+def get_data_cube(df):
+    ref, cube = data_cube_memo.get(id(df),(None,None))
+    return cube if ref is not None and ref() is df else None
+
+
+# %% ../nbs/02_pp.ipynb 25
 special_columns = ['id','weight','draw','training_subsample', '__index_level_0__']
 
-# Get all data required for a given graph
-# Only return columns and rows that are needed
-# This can handle either a pandas DataFrame or a polars LazyDataFrame (to allow for loading only needed data)
-# NB: LazyDataFrame support is not maintained and is likely to be at least somewhat broken. Keeping code in in case it ever becomes relevant
-def get_filtered_data(full_df, data_meta, pp_desc, columns=[]):
+# Polars LazyFrame engine: the filters and column projection go into the (parquet) scan
+# Filter values in the column dtype, keeping only the ones that can match (as pandas isin would), since polars raises on the rest
+# Strings only match string-like columns, other values only if they convert to the dtype and back unchanged (1.5 is not an int)
+def lazy_filter_values(flst, dtype):
+    str_col = dtype == pl.String or isinstance(dtype,(pl.Categorical,pl.Enum))
+    vals = []
+    for f in flst:
+        if f is None or isinstance(f,str) != str_col: continue
+        if str_col: vals.append(f); continue
+        try: cv = pl.Series([f]).cast(dtype).item()
+        except Exception: continue # i.e. out of range for the dtype
+        if cv == f: vals.append(cv)
+    return pl.Series(vals, dtype=pl.String if str_col else dtype)
+
+# Categoricals are filtered on directly but selected as strings, so no global string cache is needed
+# Row positions are kept in __row__ so draws line up with the full data as they do for pandas
+def lazy_filter(ldf, cols, filter_dict, c_meta):
+    inds, schema = pl.lit(True), ldf.collect_schema()
+    for k, v in filter_dict.items():
+        flst = filter_values(k, v, c_meta)
+        if flst is None: inds = inds & (pl.col(k)>=v[1]) & (pl.col(k)<=v[2])
+        else: inds = inds & pl.col(k).is_in(lazy_filter_values(flst, schema[k])) & pl.col(k).is_not_null()
+    cat_cols = [ c for c in cols if isinstance(schema[c],(pl.Categorical,pl.Enum)) ]
+    return ldf.with_row_index('__row__').filter(inds).select(['__row__']+[ pl.col(c).cast(pl.String) if c in cat_cols else pl.col(c) for c in cols ]), cat_cols
+
+# Turn string columns back into categoricals, in meta order where known
+def restore_categoricals(df, cat_cols, c_meta):
+    for c in [ c for c in cat_cols if c in df.columns ]:
+        cats = c_meta[c].get('categories','infer') if c in c_meta else 'infer'
+        if cats == 'infer' or not set(df[c].dropna().unique()) <= set(cats): cats = None # Fall back to sorted values
+        df[c] = pd.Categorical(df[c], categories=cats, ordered=c_meta[c].get('ordered',False) if c in c_meta else False)
+    return df
 
-    plot_meta = get_plot_meta(pp_desc['plot'])
+# Collect a lazy query to pandas, with categoricals restored
+def lazy_collect(lq, cat_cols, c_meta):
+    df = restore_categoricals(lq.collect().to_pandas(), cat_cols, c_meta)
+    if '__row__' in df.columns: df = df.set_index(df.pop('__row__').astype('int64').rename(None)) # Row index is u32 in polars, int64 in pandas
+    return df
+
+# Filter out the unused categories so plots are cleaner
+def trim_categories(df, c_meta, res_col):
+    for k in df.columns:
+        if k == 'id': continue
+        if df[k].dtype.name == 'category':
+            kmeta = c_meta.get(k,{})
+            m_cats = kmeta['categories'] if kmeta.get('categories','infer')!='infer' else None
+            f_cats = get_cats(df[k],m_cats) if k != res_col or not kmeta.get('likert') else m_cats # Do not trim likert as plots need to be symmetric
+            ordered = kmeta.get('ordered',False)
+            if f_cats is None or list(df[k].dtype.categories) != list(f_cats) or df[k].dtype.ordered != ordered: # Only rebuild columns that change
+                df[k] = pd.Categorical(df[k],f_cats,ordered=ordered)
+    return df
+
+# Remove prefix from question names in plots
+def strip_question_prefix(pparams, c_meta, gc_dict, res_col):
+    if 'col_prefix' in c_meta[res_col] and res_col in gc_dict:
+        prefix = c_meta[res_col]['col_prefix']
+        cmap = { c: c.replace(prefix,'') for c in pparams['data']['question'].dtype.categories }
+        pparams['data']['question'] = pparams['data']['question'].cat.rename_categories(cmap)
+    return pparams
+
+# Min and max over columns of a parquet file, from row group statistics if all row groups have them
+def parquet_value_range(pf, cols):
+    mins, maxs = [], []
+    for i in range(pf.metadata.num_row_groups):
+        rg = pf.metadata.row_group(i)
+        for j in range(rg.num_columns):
+            cm = rg.column(j)
+            if cm.path_in_schema not in cols: continue
+            if cm.statistics is None or not cm.statistics.has_min_max: return parquet_scan_range(pf, cols)
+            mins.append(cm.statistics.min); maxs.append(cm.statistics.max)
+    return (float(min(mins)), float(max(maxs))) if mins else parquet_scan_range(pf, cols)
+
+def parquet_scan_range(pf, cols):
+    mins, maxs = [], []
+    for batch in pf.iter_batches(batch_size=parquet_batch_rows, columns=cols):
+        vals = batch.to_pandas()[cols].to_numpy(float)
+        if (~np.isnan(vals)).any(): mins.append(np.nanmin(vals)); maxs.append(np.nanmax(vals))
+    return (min(mins), max(maxs)) if mins else (0.0, 0.0)
+
+# Out-of-core engine for parquet files too large to load (e.g. draws x population rows)
+# The needed columns are streamed in batches, and each batch is filtered, put in long form and reduced to partial sums per group
+# Only longform plots with additive aggregates are covered: weighted category shares, means or sums of continuous values,
+# and approximate quantiles (agg_fn 'median~' etc), whose sketches add up like sums do
+parquet_batch_rows = 1000000
+def parquet_filtered_data(pf, data_meta, pp_desc, plot_meta, cols, draws_data):
+    gc_dict, c_meta = data_meta.group_columns, data_meta.col_meta
+    res_col, filter_dict, factor_cols = pp_desc['res_col'], pp_desc.get('filter',{}), pp_desc.get('factor_cols',[])
+    res_meta, cat_cols = c_meta[res_col], [ c for c in cols if pa.types.is_dictionary(pf.schema_arrow.field(c).type) ]
+    value_vars = [ c for c in gc_dict[res_col] if c in cols ] if res_col in gc_dict else [res_col]
+    to_cont = pp_desc.get('convert_res') == 'continuous' and res_meta.get('ordered') and res_meta.get('categories','infer') != 'infer'
+    categorical, agg_fn = value_vars[0] in cat_cols and not to_cont, plot_meta.get('agg_fn',pp_desc.get('agg_fn','mean'))
+    draws = plot_meta.get('draws') and 'draw' in cols
+    gb_dims = (['draw'] if draws else []) + [ c for c in factor_cols if c!=res_col ]
+    if (plot_meta.get('data_format')!='longform' or 'augment_to' in pp_desc or pp_desc.get('cont_transform')
+        or (not categorical and agg_fn not in ['mean','sum'] and sketch_level(agg_fn) is None) or any( c not in cat_cols+['draw','question'] for c in gb_dims )):
+        raise Exception(f"Plot {pp_desc['plot']} can not be aggregated out-of-core for res_col {res_col}")
+    if to_cont: nvals = pd.to_numeric(pd.Series(get_cat_num_vals(res_meta,pp_desc)),errors='coerce').to_numpy()
+
+    # Sketches need the value range up front, which for raw values comes from the parquet statistics
+    qlevel = None if categorical else sketch_level(agg_fn)
+    if qlevel is not None: lo, hi = (np.nanmin(nvals), np.nanmax(nvals)) if to_cont else parquet_value_range(pf, value_vars)
+
+    keys = gb_dims + [res_col] if categorical else gb_dims + (['__bin__'] if qlevel is not None else ['__all__'])
+    acc, n_datapoints, offset = None, 0, 0
+    for batch in pf.iter_batches(batch_size=parquet_batch_rows, columns=cols):
+        bdf = batch.to_pandas().set_axis(pd.RangeIndex(offset, offset+batch.num_rows)) # Row positions, for draws
+        offset += batch.num_rows
+
+        inds = np.full(len(bdf),True)
+        for k, v in filter_dict.items():
+            flst = filter_values(k, v, c_meta)
+            if flst is None: inds &= ((bdf[k]>=v[1]) & (bdf[k]<=v[2])).to_numpy()
+            else: inds &= (bdf[k].isin(flst) & bdf[k].notna()).to_numpy()
+        if not pp_desc.get('poststrat',True):
+            bdf = bdf.assign(weight = 1.0)
+            if 'training_subsample' in bdf.columns: inds &= bdf['training_subsample'].to_numpy(bool)
+        bdf = bdf[inds]
+        n_datapoints += len(bdf)
+
+        # Long form with one block per question, each with its own draws
+        weight = bdf['weight'].fillna(1.0) if 'weight' in bdf.columns else pd.Series(1.0,index=bdf.index)
+        parts = []
+        for q in value_vars:
+            qdf = bdf[[ c for c in gb_dims if c in bdf.columns ]].assign(weight=weight, __all__=0, question=q)
+            if draws and q in draws_data: qdf = deterministic_draws(qdf, draws_data[q][1], draws_data[q][0], n_total = data_meta['total_size'] )
+            if to_cont:
+                codes = pd.Categorical(bdf[q],categories=res_meta['categories']).codes
+                qdf[res_col] = np.where(codes>=0, nvals[codes], np.nan)
+            else: qdf[res_col] = bdf[q]
+            parts.append(qdf)
+        ldf = pd.concat(parts) if len(parts)>1 else parts[0]
+        if qlevel is not None: ldf['__bin__'] = sketch_bin(ldf[res_col], lo, hi)
+
+        # Partial aggregates. NA groups are kept, as rows missing res_col still count towards category share totals
+        if categorical: part = ldf.groupby(keys,observed=True,dropna=False)['weight'].agg(['sum','size'])
+        else: part = ldf.groupby(keys,observed=True,dropna=False)[res_col].agg(['sum','count','size'])
+        part = part.reset_index().astype({ c: object for c in keys if c in cat_cols })
+        acc = part if acc is None else pd.concat([acc,part]).groupby(keys,dropna=False,sort=False).sum().reset_index()
     
-    # Figure out which columns we actually need
+    acc = restore_categoricals(acc, cat_cols + ([res_col] if categorical else []), c_meta)
+    if 'question' in acc.columns: acc['question'] = pd.Categorical(acc['question'], categories=value_vars)
+    acc = trim_categories(acc, c_meta, res_col)
+
+    if categorical:
+        data = weighted_crosstab(acc.rename(columns={'sum':'weight'}), gb_dims, res_col, 'percent', normalize=plot_meta.get('agg_fn')!='sum',
+                                 group_sizes=plot_meta.get('group_sizes',False), count_col='size')
+        pparams = { 'value_col': 'percent', 'cat_col': res_col, 'data': data, 'val_format': pp_desc.get('value_format','.1%') }
+    elif qlevel is not None:
+        data = sketch_aggregate(acc, gb_dims, res_col, qlevel, lo, hi, bin_col='__bin__', count_col='size')
+        if plot_meta.get('group_sizes') and gb_dims:
+            data = data.merge(acc.groupby(gb_dims,observed=False)['size'].sum().astype('int64').rename('group_size').reset_index(),on=gb_dims,how='left')
+        pparams = { 'value_col': res_col, 'data': data, 'val_format': pp_desc.get('value_format','.1f') }
+    else: # Full product of the levels present, as groupby(observed=False) gives
+        if gb_dims:
+            levels = [ np.sort(acc[d].unique()) if d == 'draw' else pd.CategoricalIndex(acc[d].dtype.categories, dtype=acc[d].dtype) for d in gb_dims ]
+            index = pd.MultiIndex.from_product(levels, names=gb_dims) if len(gb_dims)>1 else pd.Index(levels[0], name=gb_dims[0])
+            acc = acc.set_index(gb_dims).reindex(index)
+        vals = acc['sum']/acc['count'] if agg_fn == 'mean' else acc['sum'].fillna(0.0)
+        data = pd.DataFrame({ res_col: vals })
+        if plot_meta.get('group_sizes'): data['group_size'] = acc['size'].fillna(0).astype('int64')
+        data = data.dropna(subset=[res_col]).reset_index() if gb_dims else data.reset_index(drop=True)
+        pparams = { 'value_col': res_col, 'data': data, 'val_format': pp_desc.get('value_format','.1f') }
+
+    pparams = strip_question_prefix(pparams, c_meta, gc_dict, res_col)
+    return { **pparams, 'n_datapoints': n_datapoints }
+
+# Columns (out of fcols, those of the data) that a pp_desc needs, with group aliases resolved
+def needed_columns(fcols, gc_dict, pp_desc, plot_meta, columns=[]):
     meta_cols = ['weight', 'training_subsample', '__index_level_0__'] + (['draw'] if plot_meta.get('draws') else []) + columns
     cols = [ pp_desc['res_col'] ]  + pp_desc.get('factor_cols',[]) + list(pp_desc.get('filter',{}).keys())
-    cols += [ c for c in meta_cols if c in full_df.columns and c not in cols ]
+    cols += [ c for c in meta_cols if c in fcols and c not in cols ]
+    return [ c for c in np.unique(list_aliases(cols,gc_dict)) if c in fcols ]
+
+# Boolean mask of the rows of a pandas DataFrame passing the filter dict
+# Categorical filters go through the bitmap index of the dataset (see FilterIndex)
+def filter_mask(full_df, filter_dict, c_meta):
+    inds = np.full(len(full_df),True) 
+    fidx, pinds = get_filter_index(full_df), None
+    for k, v in filter_dict.items():
+        flst = filter_values(k, v, c_meta)
+
+        # Handle continuous variables separately
+        if flst is None: # Only special case where we actually need a range
+            inds = (((full_df[k]>=v[1]) & (full_df[k]<=v[2]))).to_numpy() & inds
+            continue # NB! ordered categoricals are turned into lists of values in filter_values
+            
+        if full_df[k].dtype.name == 'category':
+            m = fidx.mask(full_df[k], flst)
+            pinds = m if pinds is None else pinds & m
+        else: inds = (full_df[k].isin(flst) & ~full_df[k].isna()).to_numpy() & inds
+    if pinds is not None: inds = np.unpackbits(pinds, count=len(full_df)).astype(bool) & inds
+    return inds
+
+# Get all data required for a given graph
+# Only return columns and rows that are needed
+# This can handle either a pandas DataFrame or a polars LazyFrame (to allow for loading only needed data)
+# With a LazyFrame, plain categorical crosstabs are also aggregated in polars and only the counts are collected
+# A pyarrow ParquetFile is aggregated out-of-core (see parquet_filtered_data)
+# n_points is the size of the dataset if full_df is an already filtered subset of it (keeps draws aligned, see e2e_plots)
+@traced_stage('get_filtered_data')
+def get_filtered_data(full_df, data_meta, pp_desc, columns=[], n_points=None):
 
-    # Remove draws_data if calcualted_draws is disabled       
-    if not pp_desc.get('calculated_draws',True):
-        data_meta = data_meta.copy()
-        del data_meta['draws_data']
+    plot_meta = get_plot_meta(pp_desc['plot'])
+    lazy = isinstance(full_df,pl.LazyFrame)
+
+    # Ignore draws_data if calcualted_draws is disabled       
+    draws_data = data_meta.get('draws_data',{}) if pp_desc.get('calculated_draws',True) else {}
     
     # If any aliases are used, cconvert them to column names according to the data_meta
-    gc_dict = group_columns_dict(data_meta)
-    c_meta = extract_column_meta(data_meta)
+    data_meta = get_meta_index(data_meta)
+    gc_dict, c_meta = data_meta.group_columns, data_meta.col_meta
+
+    # Answer from the pre-aggregated cube if one was built for this dataset and it covers the pp_desc
+    cube = None if lazy else get_data_cube(full_df)
+    if cube is not None and pp_desc['res_col'] not in gc_dict:
+        with trace_span('cube') as span:
+            pparams = cube.query(pp_desc, plot_meta, c_meta, draws_data, columns)
+            span['rows_out'] = data_rows(pparams)
+        if pparams is not None: return pparams
     
     # Dict to remap (short) category names to longer descriptions in tooltips
     label_dict = {}
     
-    cols = [ c for c in np.unique(list_aliases(cols,gc_dict)) if c in full_df.columns ]
+    # Figure out which columns we actually need
+    cols = needed_columns(frame_columns(full_df), gc_dict, pp_desc, plot_meta, columns)
     
     #print("C",cols)
     
-    lazy = isinstance(full_df,pl.LazyFrame)
-    if lazy: pl.enable_string_cache() # Needed for categories to be comparable to strings
-    
-    df = full_df.select(cols) if lazy else full_df[cols]
+    if isinstance(full_df,pq.ParquetFile): return parquet_filtered_data(full_df, data_meta, pp_desc, plot_meta, cols, draws_data)
 
-    # Replace draw with the draws used in modelling. Groups are handled separately below
-    # NB! Has to happen before filtering or the draws are computed for wrong size df
-    # Workaround would be to compute for a dummy df and merge on indices later
-    if 'draw' in df.columns and pp_desc['res_col'] in data_meta.get('draws_data',{}):
-        uid, ndraws = data_meta['draws_data'][pp_desc['res_col']]
-        df = deterministic_draws(df, ndraws, uid, n_total = data_meta['total_size'] )
-    n_points = len(df) # This is used later for draws
-    
-    # Filter using demographics dict. This is very clever but hard to read. See:
     filter_dict = pp_desc.get('filter',{})
-    inds = True if lazy else np.full(len(df),True) 
-    for k, v in filter_dict.items():
-        
-        # Range filters have form [None,start,end]
-        is_range = isinstance(v,list) and v[0] is None and len(v)==3
-
-        # Handle continuous variables separately
-        if  is_range and (not isinstance(v[1],str) or c_meta[k].get('continuous') or c_meta[k].get('datetime')): # Only special case where we actually need a range
-            if lazy: inds = (((pl.col(k)>=v[1]) & (pl.col(k)<=v[2]))) & inds
-            else: inds = (((df[k]>=v[1]) & (df[k]<=v[2]))) & inds
-            continue # NB! this approach does not work for ordered categoricals with polars LazyDataFrame, hence handling that separately below
-        
-        # Filter by list of values:
-        if is_range: # Range of values over ordered categorical
-            if c_meta[k].get('categories','infer')=='infer': raise Exception(f'Ordering unknown for column {k}')
-            cats = list(c_meta[k]['categories'])
-            if set(v[1:]) & set(cats) != set(v[1:]): raise Exception(f'Column {k} values {v} not found in {cats}')
-            bi, ei = cats.index(v[1]), cats.index(v[2])
-            flst = cats[bi:ei+1] # 
-        elif isinstance(v,list): flst = v # List indicates a set of values
-        elif 'groups' in c_meta[k] and v in c_meta[k]['groups']:
-            flst = c_meta[k]['groups'][v]
-        else: flst = [v] # Just filter on single value    
-            
-        inds =  (pl.col(k).is_in(flst) & ~pl.col(k).is_null() if lazy else df[k].isin(flst) & ~df[k].isna()) & inds
-            
-    filtered_df = df.filter(inds).collect().to_pandas() if lazy else df[inds].copy()
-    if lazy and '__index_level_0__' in filtered_df.columns: # Fix index, if provided. This is a hack but seems to be needed as polars does not handle index properly by default
-        filtered_df.index = filtered_df['__index_level_0__'] 
-
+    if lazy:
+        lq, cat_cols = lazy_filter(full_df, cols, filter_dict, c_meta)
+
+        # Aggregate in polars and answer from a cube built on the (small) collected counts
+        res_col, with_draws = pp_desc['res_col'], plot_meta.get('draws') and 'draw' in cols
+        keep = (['draw'] if with_draws else []) + [ c for c in pp_desc.get('factor_cols',[]) if c!=res_col ] + [res_col]
+        if res_col not in gc_dict and DataCube.applicable(pp_desc, plot_meta, draws_data, columns) and all(c in cat_cols or c=='draw' for c in keep):
+            wsum = pl.col('weight').fill_null(1.0).sum() if 'weight' in cols else pl.len().cast(pl.Float64).alias('weight')
+            agg = lazy_collect(lq.group_by(keep).agg(wsum, pl.len().alias('count')), cat_cols, c_meta)
+            pparams = DataCube(agg, keep, count_col='count').query({ **pp_desc, 'filter': {} }, plot_meta, c_meta, draws_data, columns)
+            if pparams is not None: return pparams
+
+        with trace_span('filter') as span:
+            filtered_df = lazy_collect(lq, cat_cols, c_meta)
+            span['rows_out'] = len(filtered_df)
+        n_points = full_df.select(pl.len()).collect().item() if 'draw' in cols else len(filtered_df)
+        if 'draw' in cols and pp_desc['res_col'] in draws_data: # Positional, so it works after filtering too
+            with trace_span('draws', len(filtered_df)):
+                uid, ndraws = draws_data[pp_desc['res_col']]
+                filtered_df = deterministic_draws(filtered_df, ndraws, uid, n_total = data_meta['total_size'] )
+    else:
+        # Filter using demographics dict. The rows are taken once, by position, from the needed columns only
+        # If no rows are filtered out, the columns are shared with full_df instead, so they are only replaced from here on
+        with trace_span('filter', len(full_df)) as span:
+            mask = filter_mask(full_df, filter_dict, c_meta)
+            filtered_df = take_frame(full_df, cols, None if mask.all() else np.flatnonzero(mask))
+            span['rows_out'] = len(filtered_df)
+        if n_points is None: n_points = len(full_df) # This is used later for draws
+
+        # Replace draw with the draws used in modelling. Groups are handled separately below
+        # Draws are matched to rows by index (their position in the full data), so this works after filtering
+        if 'draw' in filtered_df.columns and pp_desc['res_col'] in draws_data:
+            with trace_span('draws', len(filtered_df)):
+                uid, ndraws = draws_data[pp_desc['res_col']]
+                filtered_df = deterministic_draws(filtered_df, ndraws, uid, n_total = data_meta['total_size'] )
     
     # If not poststratisfied
     if not pp_desc.get('poststrat',True):
-        filtered_df = filtered_df.assign(weight = 1.0) # Remove weighting
+        filtered_df = with_columns(filtered_df, weight = 1.0) # Remove weighting
         if 'training_subsample' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['training_subsample']]
+            filtered_df = take_frame(filtered_df, filtered_df.columns, np.flatnonzero(filtered_df['training_subsample'].to_numpy(bool)))
     
     n_datapoints = len(filtered_df)
 
     # Convert ordered categorical to continuous if we can
     res_meta = c_meta[pp_desc['res_col']]
     if pp_desc.get('convert_res') == 'continuous' and res_meta.get('ordered') and res_meta.get('categories','infer') != 'infer':
-        nvals = get_cat_num_vals(res_meta,pp_desc) 
-        cmap = dict(zip(res_meta['categories'],nvals))
+        nvals = pd.to_numeric(pd.Series(get_cat_num_vals(res_meta,pp_desc)),errors='coerce').to_numpy() # None -> nan
         rc = gc_dict[pp_desc['res_col']] if pp_desc['res_col'] in gc_dict else [pp_desc['res_col']]
-        for col in rc:
-            filtered_df[col] = pd.to_numeric(filtered_df[col].astype('object').replace(cmap))
+        for col in rc: # Map via category codes instead of a round-trip through python objects. Works for arrow strings too
+            codes = pd.Categorical(filtered_df[col],categories=res_meta['categories']).codes
+            filtered_df[col] = np.where(codes>=0, nvals[codes], np.nan)
 
     # Apply continuous transformation
     dfcols = gc_dict.get(pp_desc['res_col'],[pp_desc['res_col']])
@@ -292,39 +830,37 @@ def get_filtered_data(full_df, data_meta, pp_desc, columns=[]):
     # If res_col is a group of questions
     # This might move to wrangle but currently easier to do here as we have gc_dict handy
     if pp_desc['res_col'] in gc_dict:
-        value_vars = [ c for c in gc_dict[pp_desc['res_col']] if c in cols ]
-        if 'draw' in filtered_df.columns: ddraws = filtered_df['draw'] # Set aside draws as series for later
-        
-        id_vars = ['id'] + [ c for c in cols if (c not in value_vars or c in pp_desc.get('factor_cols',[])) ] # Make sure we leave factors in - in case we are faceting over one of the questions
-        filtered_df = filtered_df.reset_index(names='id').melt(id_vars=id_vars, value_vars=value_vars, var_name='question', value_name=pp_desc['res_col'])
-
-        # Fix the draws for each question separately
-        if 'draw' in filtered_df.columns:
-            draw_ar = []
-            for c in value_vars:
-                if c in data_meta.get('draws_data',{}):
-                    uid, ndraws = data_meta['draws_data'][c]
-                    draws = stable_draws(n_points, ndraws, uid)
-                else: draws = ddraws
-                draw_ar.append(pd.DataFrame({'draw': draws, 'question': c, 'id': np.arange(n_points) }))
-            filtered_df = filtered_df.drop(columns=['draw']).merge(pd.concat(draw_ar),on=['id','question'],how='left')
-
-        if plot_meta.get('data_format') != 'raw': filtered_df.drop(columns=['id'],inplace=True)
-
-        # Convert to proper category with correct order
-        filtered_df['question'] = pd.Categorical(filtered_df['question'],value_vars)
+        with trace_span('melt', len(filtered_df)) as span:
+            value_vars = [ c for c in gc_dict[pp_desc['res_col']] if c in cols ]
+            id_vars = [ c for c in cols if (c not in value_vars or c in pp_desc.get('factor_cols',[])) and c!='draw' ] # Make sure we leave factors in - in case we are faceting over one of the questions
+            n, nq = len(filtered_df), len(value_vars)
+
+            # Build the long form directly, with the same result as melt: id_vars are tiled, values stacked
+            # and question is repeated codes in the correct order
+            tile = np.tile(np.arange(n), nq)
+            ldf = { 'id': np.tile(filtered_df.index.to_numpy(), nq) } if plot_meta.get('data_format') == 'raw' else {}
+            for c in id_vars: ldf[c] = filtered_df[c].array.take(tile) # Without going through an index
+            ldf['question'] = pd.Categorical.from_codes(np.repeat(np.arange(nq), n), value_vars)
+            ldf[pp_desc['res_col']] = stack_columns(filtered_df, value_vars)
+
+            # Fix the draws for each question separately, attaching them by the position of the row in the data
+            if 'draw' in filtered_df.columns:
+                pos = pd.RangeIndex(n_points).get_indexer(filtered_df.index)
+                draw_ar = []
+                for c in value_vars:
+                    if c in draws_data:
+                        uid, ndraws = draws_data[c]
+                        draws = stable_draws(n_points, ndraws, uid)
+                        draw_ar.append(draws[pos] if (pos>=0).all() else np.where(pos>=0, draws[pos], np.nan))
+                    else: draw_ar.append(filtered_df['draw'].to_numpy())
+                ldf['draw'] = np.concatenate(draw_ar)
+            filtered_df = pd.DataFrame(ldf, copy=False) # Columns are new, so no need to copy them again
+            span['rows_out'] = len(filtered_df)
     elif 'question' in pp_desc['factor_cols']: # Create 'question' as a dummy dimension
         filtered_df['question'] = pd.Categorical([pp_desc['res_col']]*len(filtered_df))   
 
     # Filter out the unused categories so plots are cleaner
-    for k in filtered_df.columns:
-        if k == 'id': continue
-        if filtered_df[k].dtype.name == 'category':
-            m_cats = c_meta[k]['categories'] if c_meta[k].get('categories','infer')!='infer' else None
-            f_cats = get_cats(filtered_df[k],m_cats) if k != pp_desc['res_col'] or not c_meta[k].get('likert') else m_cats # Do not trim likert as plots need to be symmetric
-            
-            #vals = filtered_df[k]
-            filtered_df[k] = pd.Categorical(filtered_df[k],f_cats,ordered=c_meta[k].get('ordered',False))
+    filtered_df = trim_categories(filtered_df, c_meta, pp_desc['res_col'])
     
     # Aggregate the data into right shape
     pparams = wrangle_data(filtered_df, data_meta, pp_desc)
@@ -332,20 +868,15 @@ def get_filtered_data(full_df, data_meta, pp_desc, columns=[]):
 
     
     # Remove prefix from question names in plots
-    if 'col_prefix' in c_meta[pp_desc['res_col']] and pp_desc['res_col'] in gc_dict:
-        prefix = c_meta[pp_desc['res_col']]['col_prefix']
-        cmap = { c: c.replace(prefix,'') for c in pparams['data']['question'].dtype.categories }
-        pparams['data']['question'] = pparams['data']['question'].cat.rename_categories(cmap)
-            
+    pparams = strip_question_prefix(pparams, c_meta, gc_dict, pp_desc['res_col'])
     
     # How many datapoints the plot is based on. This is useful metainfo to display sometimes
     pparams['n_datapoints'] = n_datapoints
     
-    if lazy: pl.disable_string_cache()
     
     return pparams
 
-# %% ../nbs/02_pp.ipynb 21
+# %% ../nbs/02_pp.ipynb 27
 def discretize_continuous(col, col_meta={}):
 
     if 'bin_breaks' in col_meta and 'bin_labels' in col_meta:
@@ -358,11 +889,104 @@ def discretize_continuous(col, col_meta={}):
         cut = cut_nice(col, breaks, format=col_meta.get('value_format','.1f'))
     return cut
 
+# Combine the codes of cols into one integer key per row, along with the levels of each col
+# Categoricals keep all their categories and other columns their sorted unique values, as groupby(observed=False) does
+# Missing values get an extra last slot in each column, so key ranges over prod(len(levels)+1) values
+def group_codes(df, cols):
+    key, levels = np.zeros(len(df),dtype='int64'), []
+    for c in cols:
+        if df[c].dtype.name == 'category': codes, lv = df[c].cat.codes.to_numpy(), df[c].dtype.categories
+        else: codes, lv = pd.factorize(df[c], sort=True)
+        key *= len(lv)+1
+        key += np.where(codes<0, len(lv), codes)
+        levels.append(lv)
+    return key, levels
+
+# Weighted shares of a categorical res_col within gb_dims groups, from a single bincount pass
+# Same output as groupby(gb_dims+[res_col]).sum() divided by the groupby(gb_dims) totals (normalize=False skips the division)
+# count_col gives row counts for group sizes when df itself is already aggregated
+def weighted_crosstab(df, gb_dims, res_col, value_col, normalize=True, group_sizes=False, count_col=None):
+    key, levels = group_codes(df, gb_dims+[res_col])
+    shape = [ len(lv)+1 for lv in levels ]
+    wsum = np.bincount(key, weights=df['weight'].to_numpy(float), minlength=int(np.prod(shape))).astype(float,copy=False).reshape(shape)
+
+    # Rows missing a group dimension are dropped, but ones missing only res_col still count towards group totals
+    inner = tuple( slice(0,n-1) for n in shape )
+    vals = wsum[inner]
+    if normalize:
+        with np.errstate(invalid='ignore', divide='ignore'): vals = vals / wsum.sum(axis=-1,keepdims=True)[inner[:-1]]
+
+    vals = vals.reshape(-1)
+    idx = np.flatnonzero(~np.isnan(vals))
+    data = {}
+    for c, lv, codes in zip(gb_dims+[res_col], levels, np.unravel_index(idx, [ n-1 for n in shape ])):
+        data[c] = pd.Categorical.from_codes(codes, dtype=df[c].dtype) if df[c].dtype.name == 'category' else lv.take(codes)
+    data[value_col] = vals[idx]
+    if group_sizes:
+        counts = df[count_col].to_numpy(float) if count_col else None
+        sizes = np.bincount(key//shape[-1], weights=counts, minlength=int(np.prod(shape[:-1]))).astype('int64').reshape(shape[:-1])[inner[:-1]]
+        data['group_size'] = sizes.reshape(-1)[idx//(shape[-1]-1)]
+    return pd.DataFrame(data)
+
+# Approximate quantiles, selected by agg_fn of form 'median~' or 'p<N>~' (f.e. 'p90~' for the 90th percentile)
+# Values are counted into sketch_bins equal-width bins over a known range [lo,hi], so a sketch is just a count per bin
+# and sketches merge by adding them, like the sums behind means and shares do (over batches or cube cells)
+# Quantiles interpolate linearly within a bin, so they are within (hi-lo)/sketch_bins of the value at rank q*n
+sketch_bins = 1024
+def sketch_level(agg_fn):
+    m = re.fullmatch(r'(median|p(\d+(?:\.\d+)?))~', agg_fn) if isinstance(agg_fn,str) else None
+    if m is None: return None
+    return 0.5 if m.group(2) is None else float(m.group(2))/100
+
+# Bin of each value, or -1 for missing values
+def sketch_bin(vals, lo, hi):
+    vals = np.asarray(vals, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b = np.floor((vals-lo)/(hi-lo)*sketch_bins) if hi>lo else np.zeros(len(vals))
+    return np.where(np.isnan(vals), -1, np.clip(np.nan_to_num(b), 0, sketch_bins-1)).astype('int64')
+
+# Quantile q of each row of counts (n x sketch_bins), nan for empty rows
+def sketch_quantiles(counts, q, lo, hi):
+    n, cum = counts.sum(axis=-1), np.cumsum(counts, axis=-1)
+    t = np.maximum(q*n, 0.5)
+    i = np.argmax(cum >= t[...,None], axis=-1)
+    c = np.take_along_axis(counts, i[...,None], axis=-1)[...,0]
+    before = np.take_along_axis(cum, i[...,None], axis=-1)[...,0] - c
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vals = lo + (i + (t-before)/c)*(hi-lo)/sketch_bins
+    return np.where(n>0, np.minimum(vals, hi), np.nan)
+
+# Approximate quantile q of res_col within gb_dims groups, with the same output as groupby(gb_dims)[res_col].quantile(q).dropna()
+# For data that is already binned and aggregated (as out-of-core), bin_col has the bins of [lo,hi] and count_col the row counts
+def sketch_aggregate(df, gb_dims, res_col, q, lo=None, hi=None, bin_col=None, count_col=None):
+    key, levels = group_codes(df, gb_dims)
+    shape = [ len(lv)+1 for lv in levels ]
+    if bin_col is None:
+        vals = df[res_col].to_numpy(float)
+        lo, hi = (np.nanmin(vals), np.nanmax(vals)) if (~np.isnan(vals)).any() else (0.0, 0.0)
+        bins = sketch_bin(vals, lo, hi)
+    else: bins = df[bin_col].to_numpy('int64')
+    
+    sel = bins>=0
+    counts = np.bincount(key[sel]*sketch_bins + bins[sel], weights=(df[count_col].to_numpy(float)[sel] if count_col else None),
+                         minlength=int(np.prod(shape))*sketch_bins).reshape(shape+[sketch_bins])
+    vals = sketch_quantiles(counts[tuple( slice(0,n-1) for n in shape )], q, lo, hi)
+    if not gb_dims: return pd.DataFrame({ res_col: [vals.item()] })
+
+    vals = vals.reshape(-1)
+    idx = np.flatnonzero(~np.isnan(vals))
+    data = {}
+    for c, lv, codes in zip(gb_dims, levels, np.unravel_index(idx, [ n-1 for n in shape ])):
+        data[c] = pd.Categorical.from_codes(codes, dtype=df[c].dtype) if df[c].dtype.name == 'category' else lv.take(codes)
+    data[res_col] = vals[idx]
+    return pd.DataFrame(data)
+
 # Helper function that handles reformating data for create_plot
+@traced_stage('wrangle_data')
 def wrangle_data(raw_df, data_meta, pp_desc):
     
     plot_meta = get_plot_meta(pp_desc['plot'])
-    col_meta = extract_column_meta(data_meta)
+    col_meta = get_meta_index(data_meta).col_meta
 
     res_col, factor_cols = pp_desc.get('res_col'), pp_desc.get('factor_cols')
     
@@ -371,11 +995,13 @@ def wrangle_data(raw_df, data_meta, pp_desc):
     gb_dims = (['draw'] if draws else []) + (['id'] if 'id' in raw_df.columns else []) + (factor_cols if factor_cols else [])
     if res_col in gb_dims: gb_dims.remove(res_col) # Remove res_col from groupby dimensions in this function
     
-    if 'weight' not in raw_df.columns: raw_df = raw_df.assign(weight=1.0) # This also works for empty df-s
-    else: raw_df.loc[:,'weight'] = raw_df['weight'].fillna(1.0)
+    if 'weight' not in raw_df.columns: raw_df = with_columns(raw_df, weight=1.0) # This also works for empty df-s
+    elif raw_df['weight'].hasnans: raw_df['weight'] = raw_df['weight'].fillna(1.0) # Replaced, not modified, as the column may be shared
 
-    if draws and 'draw' in raw_df.columns and 'augment_to' in pp_desc: # Should we try to bootstrap the data to always have augment_to points. Note this is relatively slow
-        raw_df = augment_draws(raw_df,gb_dims[1:],threshold=pp_desc['augment_to'])
+    if draws and 'draw' in raw_df.columns and 'augment_to' in pp_desc: # Should we try to bootstrap the data to always have augment_to points. Optional augment_seed makes it reproducible
+        with trace_span('augment_draws', len(raw_df)) as span:
+            raw_df = augment_draws(raw_df,gb_dims[1:],threshold=pp_desc['augment_to'],seed=pp_desc.get('augment_seed'))
+            span['rows_out'] = len(raw_df)
         
     pparams = { 'value_col': 'value' }
     data = None
@@ -401,19 +1027,19 @@ def wrangle_data(raw_df, data_meta, pp_desc):
             pparams['cat_col'] = res_col 
             pparams['value_col'] = 'percent'
             
-            # Aggregate the data
-            data = raw_df.groupby(gb_dims+[res_col],observed=False)['weight'].sum()
-            if plot_meta.get('agg_fn')!='sum': data /= gb_in(raw_df,gb_dims)['weight'].sum()
-            data = data.rename(pparams['value_col']).dropna().reset_index()
+            # Aggregate the data (group sizes come from the same key)
+            data = weighted_crosstab(raw_df, gb_dims, res_col, pparams['value_col'],
+                                     normalize=plot_meta.get('agg_fn')!='sum', group_sizes=plot_meta.get('group_sizes',False))
             
         else: # Continuous
             agg_fn = pp_desc.get('agg_fn','mean') # We may want to try median vs mean or plot sd-s or whatever
             agg_fn = plot_meta.get('agg_fn',agg_fn) # Some plots mandate this value (election model for instance)
-            if len(gb_dims)>0: data = getattr(gb_in(raw_df,gb_dims)[res_col],agg_fn)().dropna().reset_index() 
+            if sketch_level(agg_fn) is not None: data = sketch_aggregate(raw_df, gb_dims, res_col, sketch_level(agg_fn))
+            elif len(gb_dims)>0: data = getattr(gb_in(raw_df,gb_dims)[res_col],agg_fn)().dropna().reset_index() 
             else: data = pd.DataFrame({res_col: [getattr(raw_df[res_col],agg_fn)()]}) # Single value data frame
             pparams['value_col'] = res_col
             
-        if plot_meta.get('group_sizes'):
+        if plot_meta.get('group_sizes') and 'group_size' not in data.columns:
             data = data.merge(gb_in(raw_df,gb_dims).size().rename('group_size').reset_index(),on=gb_dims,how='left')
     else:
         raise Exception("Unknown data_format")
@@ -423,7 +1049,116 @@ def wrangle_data(raw_df, data_meta, pp_desc):
     pparams['data'] = data
     return pparams
 
-# %% ../nbs/02_pp.ipynb 22
+# %% ../nbs/02_pp.ipynb 34
+# Cache for get_filtered_data results, keyed by the dataset, its meta and the (canonicalized) pp_desc
+# Memory tier is an LRU bounded by bytes held. Optional disk tier stores parquet files in disk_dir that survive restarts
+# NB! Datasets are fingerprinted once per object, so they should not be modified in place after use
+# Empty categoricals come back from parquet as objects, so with data_meta given, get restores them as the miss would have them
+# Safe to share between threads: the memory tier is behind a lock and disk files are written to a temporary file first
+class ResultCache:
+    def __init__(self, max_bytes=256*2**20, disk_dir=None):
+        self.max_bytes, self.disk_dir = max_bytes, disk_dir
+        self.mem, self.nbytes = OrderedDict(), 0
+        self.hits, self.disk_hits, self.misses = 0, 0, 0
+        self.lock = threading.RLock()
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    def disk_file(self, key): return os.path.join(self.disk_dir, key + '.parquet')
+
+    def get(self, key, data_meta=None):
+        with self.lock:
+            if key in self.mem:
+                self.hits += 1
+                self.mem.move_to_end(key)
+                return self.mem[key][0]
+        if self.disk_dir and os.path.exists(self.disk_file(key)):
+            data, pparams = load_parquet_with_metadata(self.disk_file(key), arrow_dtypes=False)
+            cat_cols = [ c for c in pparams.pop('cat_cols',[]) if data[c].dtype.name != 'category' ]
+            if cat_cols and data_meta is not None:
+                c_meta = get_meta_index(data_meta).col_meta
+                data = trim_categories(restore_categoricals(data, cat_cols, c_meta), c_meta, pparams.get('cat_col'))
+            with self.lock: self.disk_hits += 1
+            pparams = { **pparams, 'data': data }
+            self.put(key, pparams, to_disk=False)
+            return pparams
+        with self.lock: self.misses += 1
+        return None
+
+    def put(self, key, pparams, to_disk=True):
+        size = int(pparams['data'].memory_usage(deep=True).sum())
+        with self.lock:
+            if key in self.mem: return
+            self.mem[key] = (pparams, size); self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self.mem) > 1:
+                _, (_, s) = self.mem.popitem(last=False); self.nbytes -= s
+        
+        if to_disk and self.disk_dir: # Readers only ever see complete files
+            tmp = f'{self.disk_file(key)}.{threading.get_ident()}.tmp'
+            try:
+                cat_cols = [ c for c in pparams['data'].columns if pparams['data'][c].dtype.name=='category' ]
+                save_parquet_with_metadata(pparams['data'], { **{ k: v for k,v in pparams.items() if k!='data' }, 'cat_cols': cat_cols }, tmp)
+                os.replace(tmp, self.disk_file(key))
+            except (pa.ArrowException, TypeError, ValueError) as e:
+                if os.path.exists(tmp): os.remove(tmp)
+                warn(f"Could not cache result on disk: {e}")
+
+    def clear(self, disk=False):
+        with self.lock: self.mem.clear(); self.nbytes = 0
+        if disk and self.disk_dir:
+            for f in glob.glob(os.path.join(self.disk_dir,'*.parquet')): os.remove(f)
+
+    def metrics(self):
+        with self.lock:
+            n = self.hits + self.disk_hits + self.misses
+            return { 'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                     'hit_rate': (self.hits + self.disk_hits)/n if n else 0.0,
+                     'entries': len(self.mem), 'bytes': self.nbytes }
+
+# Default cache used by e2e_plot(cache=True)
+result_cache = ResultCache()
+
+# Fingerprint of a dataframe's contents. Memoized per object, as hashing is O(n)
+data_fingerprint_memo = {}
+def data_fingerprint(df):
+    return weak_memo(data_fingerprint_memo, df, compute_fingerprint)
+
+def compute_fingerprint(df):
+    h = sha256(json.dumps([ [str(c), str(t)] for c,t in df.dtypes.items() ]).encode())
+    h.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+    for c in df.columns:
+        try: ch = pd.util.hash_pandas_object(df[c], index=False)
+        except TypeError: ch = pd.util.hash_pandas_object(df[c].astype('str'), index=False) # i.e. columns of lists
+        h.update(ch.to_numpy().tobytes())
+    return h.hexdigest()
+
+# Filter value lists are sets, so their order should not matter (but range filters [None,start,end] are left as they are)
+def canonical_pp_desc(pp_desc):
+    flt = { k: (sorted(v,key=str) if isinstance(v,list) and not (len(v)==3 and v[0] is None) else v) for k,v in pp_desc.get('filter',{}).items() }
+    return { **pp_desc, 'filter': flt }
+
+# Callables in the plot meta (i.e. lod and spec_data) are keyed by name, as their str has the memory address in it
+def stable_key_default(o):
+    return f'{o.__module__}.{o.__qualname__}' if callable(o) and hasattr(o,'__qualname__') else str(o)
+
+def result_cache_key(full_df, data_meta, pp_desc, columns=[]):
+    key = [ data_fingerprint(full_df), get_meta_index(data_meta).fingerprint, canonical_pp_desc(pp_desc), columns, get_plot_meta(pp_desc['plot']) ]
+    return sha256(json.dumps(key, sort_keys=True, default=stable_key_default).encode()).hexdigest()
+
+# get_filtered_data with caching. Returns a copy, as create_plot modifies pparams
+# Polars LazyFrames and ParquetFiles can not be fingerprinted without reading them, so they are not cached
+@traced_stage('cached_filtered_data')
+def cached_filtered_data(full_df, data_meta, pp_desc, columns=[], cache=None):
+    if isinstance(full_df,(pl.LazyFrame,pq.ParquetFile)): return get_filtered_data(full_df, data_meta, pp_desc, columns)
+    cache = cache or result_cache
+    key = result_cache_key(full_df, data_meta, pp_desc, columns)
+    pparams = cache.get(key, data_meta)
+    if pparams is None:
+        pparams = get_filtered_data(full_df, data_meta, pp_desc, columns)
+        cache.put(key, pparams)
+    return { **pparams, 'data': pparams['data'].copy() }
+
+
+# %% ../nbs/02_pp.ipynb 35
 # Create a color scale
 ordered_gradient = ["#c30d24", "#f3a583", "#94c6da", "#1770ab"]
 def meta_color_scale(scale : Dict, column=None, translate=None):
@@ -436,19 +1171,39 @@ def meta_color_scale(scale : Dict, column=None, translate=None):
         cats = [ remap[c] for c in cats ]
     return to_alt_scale(scale,cats)
 
-# %% ../nbs/02_pp.ipynb 23
+# %% ../nbs/02_pp.ipynb 36
 internal_columns = ['draw','weight','group_size'] 
 
+# Translations memoized per translate function, so each string (with the same kwargs) goes through translate only once
+# Translated category dtypes are kept too, so rerenders do no string work
+translate_fn_memo = {}
+def memoize_translate(translate):
+    if hasattr(translate,'memo'): return translate
+    make = lambda _: ({}, {}) # strings, category dtypes
+    try: memo = weak_memo(translate_fn_memo, translate, make)
+    except TypeError: memo = make(None) # Not weakly referenceable (i.e. str.upper), so only memoized for this call
+    strings = memo[0]
+    def tf(s, **kwargs):
+        key = (s, *sorted(kwargs.items())) if kwargs else s
+        if key not in strings: strings[key] = translate(s, **kwargs)
+        return strings[key]
+    tf.memo = memo
+    return tf
+
+# Category dtype with translated categories. Keyed by the categories in order, as dtype equality ignores order if unordered
+def translate_dtype(dtype, translate):
+    dtypes, key = translate.memo[1] if hasattr(translate,'memo') else {}, (tuple(dtype.categories), dtype.ordered)
+    if key not in dtypes: dtypes[key] = pd.CategoricalDtype([ translate(c) for c in dtype.categories ], ordered=dtype.ordered)
+    return dtypes[key]
+
 def translate_df(df, translate):
     df.columns = [ (translate(c) if c not in internal_columns else c) for c in df.columns ]
     for c in df.columns:
         if df[c].dtype.name == 'category':
-            cats = df[c].dtype.categories
-            remap = dict(zip(cats,[ translate(c) for c in cats ]))
-            df[c] = df[c].cat.rename_categories(remap)
+            df[c] = pd.Categorical.from_codes(df[c].cat.codes, dtype=translate_dtype(df[c].dtype,translate))
     return df
 
-# %% ../nbs/02_pp.ipynb 24
+# %% ../nbs/02_pp.ipynb 38
 def create_tooltip(pparams,tc_meta):
     
     data, tfn = pparams['data'], pparams['translate']
@@ -464,13 +1219,19 @@ def create_tooltip(pparams,tc_meta):
     
     # Find a mapping for multi-column questions
     question_tn = tfn('question')
-    if question_tn in data.columns and any([ 'label' in tc_meta[c] for c in data[question_tn].unique() if c in tc_meta ]):
-        label_dict[question_tn] = { c: tc_meta[c].get('label','') for c in data[question_tn].unique() if c in tc_meta and 'label' in tc_meta[c] }
+    if question_tn in data.columns:
+        qs = data[question_tn].dtype.categories if data[question_tn].dtype.name == 'category' else data[question_tn].unique()
+        if any([ 'label' in tc_meta[c] for c in qs if c in tc_meta ]):
+            label_dict[question_tn] = { c: tc_meta[c].get('label','') for c in qs if c in tc_meta and 'label' in tc_meta[c] }
     
     # Create the tooltips
     tooltips = [ alt.Tooltip(f"{pparams['value_col']}:Q", format=pparams['val_format']) ]
     for cn in tcols:
-        if cn in label_dict:
+        if cn in label_dict and data[cn].dtype.name == 'category': # Map the categories, and take the labels by code (NA -> last)
+            labels = [ tfn(label_dict[cn][c]) if c in label_dict[cn] else c for c in data[cn].dtype.categories ]
+            data[cn+'_label'] = np.array(labels + [np.nan],dtype='object')[data[cn].cat.codes.to_numpy()]
+            t = alt.Tooltip(f"{cn}_label:N",title=cn)
+        elif cn in label_dict:
             data[cn+'_label'] = data[cn].astype('object').replace({ k:tfn(v) for k,v in label_dict[cn].items() })
             t = alt.Tooltip(f"{cn}_label:N",title=cn)
         else:
@@ -480,7 +1241,7 @@ def create_tooltip(pparams,tc_meta):
     return tooltips
     
 
-# %% ../nbs/02_pp.ipynb 25
+# %% ../nbs/02_pp.ipynb 39
 # Small helper function to move columns from internal to external columns
 def remove_from_internal_fcols(cname, factor_cols, n_inner):
     if cname not in factor_cols[:n_inner]: return n_inner
@@ -503,16 +1264,71 @@ def inner_outer_factors(factor_cols, pp_desc, plot_meta):
     
     return factor_cols, n_inner
 
-# %% ../nbs/02_pp.ipynb 26
+# %% ../nbs/02_pp.ipynb 40
+# Vega-Lite specs for plots registered with spec_data, filled in from cached templates
+# spec_data(data,...) gives the data as the chart embeds it, along with a key of anything else the chart derives from the data
+# and optionally values for named chart params (i.e. a color domain), which are set on the template rather than keyed on
+# The chart is then determined by that key and the other plot parameters, so altair builds and validates it once per template
+# and later calls only put in the data. n_datapoints is left out of the key, as plots only use it to rescale the data
+spec_templates, max_spec_templates = OrderedDict(), 256
+spec_templates_lock = threading.Lock()
+def plot_spec(plot_name, pparams, make, key):
+    def build():
+        with trace_span('plot_fn', data_rows(pparams)): chart = make(pparams)
+        with trace_span('serialize', data_rows(pparams)): return chart.to_dict()
+
+    prep = get_plot_meta(plot_name).get('spec_data')
+    if not prep: return build()
+    if prep is True: prep = lambda data: (data, None)
+
+    pdata, dkey, *pvals = prep(**{ **clean_kwargs(prep,pparams), 'data': pparams['data'].copy() })
+    pvals = pvals[0] if pvals else {}
+    args = { k: v for k, v in clean_kwargs(get_plot_fn(plot_name),pparams).items() if k not in ['data','n_datapoints'] }
+    key = repr((plot_name, key, dkey, args))
+    with spec_templates_lock:
+        cached = spec_templates.get(key)
+        if cached: spec_templates.move_to_end(key)
+    if not cached:
+        spec = build()
+        params = { p.get('name') for p in spec.get('params',[]) }
+        if len(spec.get('datasets',{}))==1 and set(pvals) <= params: # Values go into one named dataset unless the data transformer does something else
+            name = next(iter(spec['datasets']))
+            with spec_templates_lock:
+                spec_templates[key] = ({ **deepcopy(spec), 'datasets': {} }, data_refs(spec,name))
+                if len(spec_templates) > max_spec_templates: spec_templates.popitem(last=False)
+        return spec
+
+    with trace_span('serialize', len(pdata)):
+        template, refs = cached
+        name = 'data-' + sha256(pd.util.hash_pandas_object(pdata,index=False).to_numpy().tobytes()).hexdigest()[:32]
+        spec = deepcopy(template)
+        for path in refs:
+            d = spec
+            for k in path: d = d[k]
+            d['name'] = name
+        for p in spec.get('params',[]):
+            if p.get('name') in pvals: p['value'] = pvals[p['name']]
+        spec['datasets'] = { name: alt.data_transformers.get()(pdata)['values'] }
+    return spec
+
+# Paths of the references to a named dataset in a spec
+def data_refs(spec, name, path=()):
+    if isinstance(spec,dict):
+        if spec.get('name')==name and path and path[-1]=='data': return [path]
+        return [ p for k, v in spec.items() if k!='datasets' for p in data_refs(v, name, path+(k,)) ]
+    elif isinstance(spec,list): return [ p for i, v in enumerate(spec) for p in data_refs(v, name, path+(i,)) ]
+    return []
+
 # Function that takes filtered raw data and plot information and outputs the plot
 # Handles all of the data wrangling and parameter formatting
-def create_plot(pparams, data_meta, pp_desc, alt_properties={}, alt_wrapper=None, dry_run=False, width=200, return_matrix_of_plots=False, translate=None):
+@traced_stage('create_plot')
+def create_plot(pparams, data_meta, pp_desc, alt_properties={}, alt_wrapper=None, dry_run=False, width=200, return_matrix_of_plots=False, translate=None, spec=False):
     data = pparams['data']
     plot_meta = get_plot_meta(pp_desc['plot'])
-    col_meta = extract_column_meta(data_meta)
+    col_meta = get_meta_index(data_meta).col_meta # Shared and read-only, so do not modify
 
-    if 'question' in data.columns: # TODO: this should be in io.py already, probably
-      col_meta['question']['colors'] = col_meta[pp_desc['res_col']].get('question_colors',None)
+    # Colors for 'question' come from the res_col group. TODO: this should be in io.py already, probably
+    fcolors = lambda cn: col_meta[pp_desc['res_col']].get('question_colors',None) if cn=='question' else col_meta.get(cn,{}).get('colors',None)
   
     plot_args = pp_desc.get('plot_args',{})
     pparams.update(plot_args)
@@ -542,7 +1358,7 @@ def create_plot(pparams, data_meta, pp_desc, alt_properties={}, alt_wrapper=None
 
         
     # Handle translation funcion
-    if translate is None: translate = (lambda s: s)
+    translate = memoize_translate(translate) if translate is not None else (lambda s: s)
     pparams['translate'] = translate
 
     # Handle internal facets (and translate as needed)
@@ -553,36 +1369,41 @@ def create_plot(pparams, data_meta, pp_desc, alt_properties={}, alt_wrapper=None
                 'col': translate(cn),
                 'ocol': cn,
                 'order': [ translate(c) for c in data[cn].dtype.categories ],
-                'colors': meta_color_scale(col_meta[cn].get('colors',None), data[cn], translate=translate), 
+                'colors': meta_color_scale(fcolors(cn), data[cn], translate=translate), 
             }
             pparams['facets'].append(fd)
 
         # Pass on data from facet column meta if specified by plot
         for i,d in enumerate(plot_meta.get('requires',[])):
             for k, v in d.items():
-                if v=='pass': pparams[k] = col_meta[pparams['facets'][i]['ocol']].get(k)
+                if v=='pass': pparams[k] = col_meta.get(pparams['facets'][i]['ocol'],{}).get(k)
         
         factor_cols = factor_cols[n_inner:] # Leave rest for external faceting
 
     # Translate the data itself
-    pparams['data'] = data = translate_df(data,translate)
-    pparams['value_col'] = translate(pparams['value_col'])  
-    factor_cols = [ translate(c) for c in factor_cols ]
-    t_col_meta = { translate(c): v for c,v in col_meta.items() }
-
-    # Handle tooltip
-    pparams['tooltip'] = create_tooltip(pparams,t_col_meta)
+    with trace_span('translate', len(data)):
+        pparams['data'] = data = translate_df(data,translate)
+        pparams['value_col'] = translate(pparams['value_col'])  
+        factor_cols = [ translate(c) for c in factor_cols ]
+        t_col_meta = { translate(c): v for c,v in col_meta.items() }
+
+        # Handle tooltip
+        pparams['tooltip'] = create_tooltip(pparams,t_col_meta)
     
     # If we still have more than 1 factor left, merge the rest into one so we have a 2d facet
     if len(factor_cols)>1:
         n_facet_cols = len(data[factor_cols[-1]].dtype.categories)
         if not return_matrix_of_plots and len(factor_cols)>2:
 
-            # Preserve ordering of categories we combine
-            nf_order = [ ', '.join(t) for t in it.product(*[list(data[c].dtype.categories) for c in factor_cols[1:]])]
+            # Combine via a mixed-radix code over the category codes, so only observed combinations get a label
+            # Sorting the codes preserves the ordering of the categories we combine
+            cats = [ data[c].dtype.categories for c in factor_cols[1:] ]
+            ccodes = [ data[c].cat.codes.to_numpy() for c in factor_cols[1:] ]
+            na, codes = np.any([ cc<0 for cc in ccodes ],axis=0), np.ravel_multi_index(ccodes, [ len(cs) for cs in cats ], mode='clip')
+            obs = np.unique(codes[~na])
+            nf_order = [ ', '.join(map(str,t)) for t in zip(*[ cs[ci] for cs, ci in zip(cats,np.unravel_index(obs,[ len(cs) for cs in cats ])) ]) ]
             factor_col = ', '.join(factor_cols[1:])
-            jfs = data[factor_cols[1:]].agg(', '.join, axis=1)
-            data.loc[:,factor_col] = pd.Categorical(jfs,nf_order)
+            data.loc[:,factor_col] = pd.Categorical.from_codes(np.where(na, -1, np.searchsorted(obs,codes)), nf_order)
             pparams['data'] = data
             factor_cols = [factor_cols[0], factor_col]
 
@@ -608,45 +1429,72 @@ def create_plot(pparams, data_meta, pp_desc, alt_properties={}, alt_wrapper=None
     # Create the plot using it's function
     if dry_run: return pparams
     
+    # Level of detail: plots registered with lod are drawn from the summary it computes from the rows, within a point budget
+    lod = plot_meta.get('lod')
+    lod_kwargs = clean_kwargs(lod,{ **pparams, 'point_budget': pp_desc.get('point_budget',default_point_budget) }) if lod else {}
+    def with_lod(d):
+        if not lod: return d
+        with trace_span('lod', len(d)) as span:
+            d = lod(**{ **lod_kwargs, 'data': d })
+            d.attrs['lod'] = lod # So the plot function knows the rows are already reduced
+            span['rows_out'] = len(d)
+        return d
+
     # Trim down parameters list if needed
     plot_fn = get_plot_fn(pp_desc['plot'])
     pparams = clean_kwargs(plot_fn,pparams)
+    spec_key = (alt_wrapper, dims, alt_properties, factor_cols, n_facet_cols, [ list(data[c].dtype.categories) for c in factor_cols ])
     if alt_wrapper is None: alt_wrapper = lambda p: p
+    out = (lambda p: p.to_dict()) if spec else (lambda p: p) # With spec, return Vega-Lite dicts instead of altair charts
     if plot_meta.get('as_is'): # if as_is set, just return the plot as-is
-        return plot_fn(**pparams)
-    elif factor_cols:
-        if return_matrix_of_plots: # return a 2d list of plots which can be rendeed one plot at a time
-            del pparams['data']
-            combs = it.product( *[data[fc].dtype.categories for fc in factor_cols ])
-            #print( [ data[(data[factor_cols]==c).all(axis=1)] for c in combs ] )
-            #print(list(combs))
-            return list(batch([
-                alt_wrapper(plot_fn(data[(data[factor_cols]==c).all(axis=1)],**pparams)
-                            .properties(title='-'.join(map(str,c)),**dims, **alt_properties)
-                            .configure_view(discreteHeight={'step':20}))
-                for c in combs
-                ], n_facet_cols))
-        else: # Use faceting
-            if n_facet_cols==1:
-                plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).facet(
-                    row=alt.Row(f'{factor_cols[0]}:O', sort=list(data[factor_cols[0]].dtype.categories), header=alt.Header(labelOrient='top'))))
-            elif n_facet_cols==len(data[factor_cols[0]].dtype.categories):
-                plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).facet(
-                    column=alt.Column(f'{factor_cols[1]}:O', sort=list(data[factor_cols[1]].dtype.categories)),
-                    row=alt.Row(f'{factor_cols[0]}:O', sort=list(data[factor_cols[0]].dtype.categories), header=alt.Header(labelOrient='top'))))
-            else: # n_facet_cols!=1 but just one facet
-                plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).facet(f'{factor_cols[0]}:O',columns=n_facet_cols))
-            plot = plot.configure_view(discreteHeight={'step':20})
+        data = with_lod(pparams['data'])
+        with trace_span('plot_fn', len(data)): return out(plot_fn(**{ **pparams, 'data': data }))
+    elif factor_cols and return_matrix_of_plots: # return a 2d list of plots which can be rendeed one plot at a time
+        del pparams['data']
+        # Split the data in one pass: sort rows by the combined code of the facet categories and cut at the boundaries
+        # Combinations that do not occur in the data are not drawn, but left as None so the rows stay aligned with the categories
+        cats = [ data[fc].dtype.categories for fc in factor_cols ]
+        ccodes = [ data[fc].cat.codes.to_numpy() for fc in factor_cols ]
+        rows = np.flatnonzero(~np.any([ cc<0 for cc in ccodes ],axis=0))
+        codes = np.ravel_multi_index([ cc[rows] for cc in ccodes ], [ len(cs) for cs in cats ])
+        order = np.argsort(codes, kind='stable')
+        obs, starts = np.unique(codes[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        combs = zip(*[ cs[ci] for cs, ci in zip(cats,np.unravel_index(obs,[ len(cs) for cs in cats ])) ])
+        plots = [ with_lod(data.iloc[rows[order[s:e]]]) for s, e in zip(starts, ends) ]
+        with trace_span('plot_fn', len(data)):
+            plots = [ alt_wrapper(plot_fn(pdata,**pparams)
+                        .properties(title='-'.join(map(str,c)),**dims, **alt_properties)
+                        .configure_view(discreteHeight={'step':20}))
+                      for c, pdata in zip(combs, plots) ]
+        with trace_span('serialize'):
+            pmat = [None]*int(np.prod([ len(cs) for cs in cats ]))
+            for code, p in zip(obs, plots): pmat[code] = out(p)
+            return list(batch(pmat, n_facet_cols))
+
+    # The chart for pparams, faceted over the remaining factor columns
+    def make(pparams):
+        if not factor_cols:
+            return alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).configure_view(discreteHeight={'step':20}))
+        elif n_facet_cols==1:
+            plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).facet(
+                row=alt.Row(f'{factor_cols[0]}:O', sort=list(data[factor_cols[0]].dtype.categories), header=alt.Header(labelOrient='top'))))
+        elif n_facet_cols==len(data[factor_cols[0]].dtype.categories):
+            plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).facet(
+                column=alt.Column(f'{factor_cols[1]}:O', sort=list(data[factor_cols[1]].dtype.categories)),
+                row=alt.Row(f'{factor_cols[0]}:O', sort=list(data[factor_cols[0]].dtype.categories), header=alt.Header(labelOrient='top'))))
+        else: # n_facet_cols!=1 but just one facet
+            plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties).facet(f'{factor_cols[0]}:O',columns=n_facet_cols))
+        return plot.configure_view(discreteHeight={'step':20})
+
+    pparams['data'] = with_lod(pparams['data'])
+    if spec: plot = plot_spec(pp_desc['plot'], pparams, make, spec_key)
     else:
-        plot = alt_wrapper(plot_fn(**pparams).properties(**dims, **alt_properties)
-                            .configure_view(discreteHeight={'step':20}))
-
-        if return_matrix_of_plots: plot = [[plot]]
+        with trace_span('plot_fn', data_rows(pparams)): plot = make(pparams)
+    return [[plot]] if return_matrix_of_plots else plot
 
-    return plot
 
-
-# %% ../nbs/02_pp.ipynb 28
+# %% ../nbs/02_pp.ipynb 42
 # Compute the full factor_cols list, including question and res_col as needed
 def impute_factor_cols(pp_desc, col_meta, plot_meta=None):
     factor_cols = pp_desc.get('factor_cols',[]).copy()
@@ -672,42 +1520,92 @@ def impute_factor_cols(pp_desc, col_meta, plot_meta=None):
 
     return factor_cols
 
-# %% ../nbs/02_pp.ipynb 29
+# %% ../nbs/02_pp.ipynb 43
+# Impute factor_cols and check the plot is applicable to the data
+def prepare_pp_desc(pp_desc, full_df, data_meta, check_match=True, impute=True):
+    pp_desc = pp_desc.copy()
+    if impute: pp_desc['factor_cols'] = impute_factor_cols(pp_desc, data_meta.col_meta, get_plot_meta(pp_desc['plot']))
+
+    if check_match:
+        with trace_span('matching_plots'):
+            matches = matching_plots(pp_desc, full_df, data_meta, details=True, list_hidden=True)
+        if pp_desc['plot'] not in matches: 
+            raise Exception(f"Plot not registered: {pp_desc['plot']}")
+        
+        fit, imp = matches[pp_desc['plot']]
+        if  fit<0:
+            raise Exception(f"Plot {pp_desc['plot']} not applicable in this situation because of flags {imp}")
+    return pp_desc
+
 # A convenience function to draw a plot straight from a dataset
-def e2e_plot(pp_desc, data_file=None, full_df=None, data_meta=None, width=800, check_match=True, impute=True,**kwargs):
+# cache=True uses the shared result_cache for the filtered data, or a ResultCache can be given
+# lazy=True scans a parquet data_file with polars, reading only what the plot needs
+# out_of_core=True streams it in batches instead, for files larger than memory (longform plots only)
+@traced_stage('e2e_plot')
+def e2e_plot(pp_desc, data_file=None, full_df=None, data_meta=None, width=800, check_match=True, impute=True, cache=None, lazy=False, out_of_core=False, **kwargs):
     if data_file is None and full_df is None:
         raise Exception('Data must be provided either as data_file or full_df')
     if data_file is None and data_meta is None:
         raise Exception('If data provided as full_df then data_meta must also be given')
         
     if full_df is None: 
-        # No more lazy loading because a) it was very unstable b) it does not have a real use case c) it does not allow for easy virtual passes
-        #if data_file.endswith('.parquet'): # Try lazy loading as it only loads what it needs from disk
-        #    full_df, full_meta = load_parquet_with_metadata(data_file,lazy=lazy)
-        #    dm = full_meta['data']
-        #else: 
-        full_df, dm = read_annotated_data(data_file)
+        with trace_span('load') as span:
+            if out_of_core: full_df, dm = pq.ParquetFile(data_file), load_parquet_metadata(data_file)['data']
+            elif lazy and data_file.endswith('.parquet'): # Scan lazily so only the needed columns and rows are read from disk
+                full_df, full_meta = load_parquet_with_metadata(data_file,lazy=True)
+                dm = full_meta['data']
+            else: full_df, dm = read_annotated_data(data_file)
+            span['rows_out'] = data_rows(full_df)
         if data_meta is None: data_meta = dm
 
-    pp_desc = pp_desc.copy()
-    if impute: pp_desc['factor_cols'] = impute_factor_cols(pp_desc, extract_column_meta(data_meta), get_plot_meta(pp_desc['plot']))
+    data_meta = get_meta_index(data_meta) # Build the column index once and share it across the pipeline
 
-    if check_match:
-        matches = matching_plots(pp_desc, full_df, data_meta, details=True, list_hidden=True)    
-        if pp_desc['plot'] not in matches: 
-            raise Exception(f"Plot not registered: {pp_desc['plot']}")
-        
-        fit, imp = matches[pp_desc['plot']]
-        if  fit<0:
-            raise Exception(f"Plot {pp_desc['plot']} not applicable in this situation because of flags {imp}")
-            
-    pparams = get_filtered_data(full_df, data_meta, pp_desc)
+    pp_desc = prepare_pp_desc(pp_desc, full_df, data_meta, check_match, impute)
+    if cache: pparams = cached_filtered_data(full_df, data_meta, pp_desc, cache=(cache if isinstance(cache,ResultCache) else None))
+    else: pparams = get_filtered_data(full_df, data_meta, pp_desc)
     return create_plot(pparams, data_meta, pp_desc, width=width,**kwargs)
 
+# Draw many plots from the same dataset, e.g. for a dashboard page or a report
+# Plots with the same filter share one filtered frame (of the union of their columns), so each filter is applied once
+# Poststratification and draws are then handled per plot on that frame. Datasets with a DataCube answer from it directly
+# jobs>1 runs the plots in threads, each in a copy of the calling context (so plot traces and test plots carry over). Returns the list of charts (or of pparams with dry_run=True)
+def e2e_plots(pp_descs, data_file=None, full_df=None, data_meta=None, width=800, check_match=True, impute=True, jobs=1, **kwargs):
+    if data_file is None and full_df is None:
+        raise Exception('Data must be provided either as data_file or full_df')
+    if data_file is None and data_meta is None:
+        raise Exception('If data provided as full_df then data_meta must also be given')
+
+    if full_df is None:
+        full_df, dm = read_annotated_data(data_file)
+        if data_meta is None: data_meta = dm
+    data_meta = get_meta_index(data_meta)
+    pp_descs = [ prepare_pp_desc(pp, full_df, data_meta, check_match, impute) for pp in pp_descs ]
+
+    groups = defaultdict(list)
+    for i, pp in enumerate(pp_descs): groups[json.dumps(canonical_pp_desc(pp)['filter'], sort_keys=True, default=str)].append(i)
+
+    # Filtered frame shared by each group, and the pp_desc to use on it
+    tasks, use_cube = {}, get_data_cube(full_df) is not None
+    for idx in groups.values():
+        flt = pp_descs[idx[0]].get('filter',{})
+        if not flt or use_cube: tasks.update({ i: (full_df, pp_descs[i], None) for i in idx })
+        else:
+            cols = set().union(*[ needed_columns(full_df.columns, data_meta.group_columns, pp_descs[i], get_plot_meta(pp_descs[i]['plot'])) for i in idx ])
+            shared = full_df.loc[filter_mask(full_df, flt, data_meta.col_meta), [ c for c in full_df.columns if c in cols ]]
+            tasks.update({ i: (shared, { **pp_descs[i], 'filter': {} }, len(full_df)) for i in idx })
+
+    def plot(i):
+        df, fpp, n_points = tasks[i]
+        return create_plot(get_filtered_data(df, data_meta, fpp, n_points=n_points), data_meta, pp_descs[i], width=width, **kwargs)
+    if jobs>1:
+        ctxs = [ copy_context() for _ in pp_descs ] # A context can only be entered by one thread at a time
+        with ThreadPoolExecutor(max_workers=jobs) as ex: return list(ex.map(lambda i: ctxs[i].run(plot,i), range(len(pp_descs))))
+    return [ plot(i) for i in range(len(pp_descs)) ]
+
 # Another convenience function to simplify testing new plots
+# The plot is registered as 'test' for the current context only, so tests can run side by side in threads
 def test_new_plot(fn, pp_desc, *args, plot_meta={}, **kwargs):
-    stk_plot(**{**plot_meta,'plot_name':'test'})(fn) # Register the plot under name 'test'
-    pp_desc = {**pp_desc, 'plot': 'test'}
-    res = e2e_plot(pp_desc,*args,**kwargs)
-    stk_deregister('test') # And de-register it again
-    return res
+    token = local_plots.set({ **local_plots.get(), 'test': (fn, { **stk_plot_defaults, **plot_meta, 'name': 'test' }) })
+    try: return e2e_plot({**pp_desc, 'plot': 'test'},*args,**kwargs)
+    finally: local_plots.reset(token)
+
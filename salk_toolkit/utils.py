@@ -1,17 +1,18 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/10_utils.ipynb.
 
 # %% auto 0
-__all__ = ['warn', 'default_color', 'factorize_w_codes', 'batch', 'loc2iloc', 'match_sum_round', 'min_diff', 'continify',
-           'replace_cat_with_dummies', 'match_data', 'replace_constants', 'approx_str_match', 'index_encoder',
-           'to_alt_scale', 'multicol_to_vals_cats', 'gradient_to_discrete_color_scale', 'is_datetime', 'rel_wave_times',
-           'stable_draws', 'deterministic_draws', 'clean_kwargs', 'censor_dict', 'cut_nice', 'rename_cats',
-           'str_replace', 'merge_series', 'aggregate_multiselect', 'deaggregate_multiselect', 'gb_in', 'gb_in_apply',
-           'stk_defaultdict']
+__all__ = ['warn', 'default_color', 'stable_draws_cache', 'stable_draws_cache_size', 'stable_draws_lock', 'factorize_w_codes',
+           'batch', 'loc2iloc', 'match_sum_round', 'min_diff', 'continify', 'replace_cat_with_dummies', 'match_data',
+           'replace_constants', 'resolve_constants', 'approx_str_match', 'index_encoder', 'to_alt_scale',
+           'multicol_to_vals_cats', 'gradient_to_discrete_color_scale', 'is_datetime', 'rel_wave_times', 'stable_draws',
+           'deterministic_draws', 'take_frame', 'with_columns', 'clean_kwargs', 'censor_dict', 'cut_nice',
+           'rename_cats', 'str_replace', 'merge_series', 'aggregate_multiselect', 'deaggregate_multiselect', 'gb_in',
+           'gb_in_apply', 'stk_defaultdict']
 
 # %% ../nbs/10_utils.ipynb 3
-import json, os, warnings, math, inspect
+import json, os, warnings, math, inspect, threading
 import itertools as it
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 import numpy as np
 import pandas as pd
@@ -140,6 +141,26 @@ def replace_constants(d, constants = {}, inplace=False):
             
     return d
 
+# Same replacement without copying the whole dict: only containers on the path to a replaced constant are copied
+# and unchanged subtrees are shared with the input. Constant values are also shared between all places they are used
+# so treat the result as read-only (or use replace_constants if you need to modify it)
+def resolve_constants(d, constants = {}):
+    if type(d)==dict and 'constants' in d:
+        constants = {**constants, **d['constants']} # New dict so it would not propagate back up through recursion
+        d = { k:v for k,v in d.items() if k!='constants' }
+
+    res = None # Copy of d, created only when something changes
+    for k, v in (d.items() if type(d)==dict else enumerate(d)):
+        if type(v)==str and v in constants: nv = constants[v]
+        elif type(v)==dict or type(v)==list: nv = resolve_constants(v,constants)
+        else: continue
+        if nv is not v:
+            if res is None: res = d.copy()
+            res[k] = nv
+            
+    return d if res is None else res
+
+
 # %% ../nbs/10_utils.ipynb 17
 # Little function to do approximate string matching between two lists. Useful if things have multiple spellings. 
 def approx_str_match(frm,to):
@@ -199,7 +220,7 @@ def gradient_to_discrete_color_scale( grad, num_colors):
 def is_datetime(col):
     with warnings.catch_warnings():
         warnings.simplefilter(action='ignore', category=UserWarning)
-        return pd.api.types.is_datetime64_any_dtype(col) or (col.dtype.name in ['str','object'] and pd.to_datetime(col,errors='coerce').notna().any())
+        return pd.api.types.is_datetime64_any_dtype(col) or (pd.api.types.is_string_dtype(col.dtype) and pd.to_datetime(col,errors='coerce').notna().any())
 
 # %% ../nbs/10_utils.ipynb 27
 # Convert a series of wave indices and a series of survey dates into a time series usable by our gp model
@@ -213,34 +234,65 @@ def rel_wave_times(ws, dts, dt0=None):
     return pd.Series(df['wave'].replace(w_to_time),name='t')
 
 # %% ../nbs/10_utils.ipynb 29
+# Draw arrays are reused across plot calls, so keep the most recent ones around
+stable_draws_cache, stable_draws_cache_size = OrderedDict(), 32
+stable_draws_lock = threading.Lock()
+
 # Generate a random draws column that is deterministic in n, n_draws and uid
+# NB! The result is cached and shared, hence read-only
 def stable_draws(n, n_draws, uid):
+    key = (n, n_draws, str(uid))
+    with stable_draws_lock:
+        if key in stable_draws_cache:
+            stable_draws_cache.move_to_end(key)
+            return stable_draws_cache[key]
+
     # Initialize a random generator with a hash of uid
     bgen = np.random.SFC64(np.frombuffer(sha256(str(uid).encode("utf-8")).digest(), dtype='uint32'))
     gen = np.random.Generator(bgen)
     
     n_samples = int(math.ceil(n/n_draws))
-    draws = (list(range(n_draws))*n_samples)[:n]
-    return gen.permuted(draws)
+    draws = gen.permuted(np.tile(np.arange(n_draws,dtype='int64'), n_samples)[:n])
+    draws.setflags(write=False)
+
+    with stable_draws_lock:
+        stable_draws_cache[key] = draws
+        if len(stable_draws_cache) > stable_draws_cache_size: stable_draws_cache.popitem(last=False)
+    return draws
 
 # Use the stable_draws function to deterministicall assign shuffled draws to a df 
+# Rows are matched to draws by their index, which is assumed to be the position in the full data (of size n_total)
 def deterministic_draws(df, n_draws, uid, n_total=None):
     if n_total is None: n_total = len(df)
-    df.loc[:,'draw'] = pd.Series(stable_draws(n_total, n_draws, uid), index = np.arange(n_total))
+    draws, pos = stable_draws(n_total, n_draws, uid), pd.RangeIndex(n_total).get_indexer(df.index)
+    df['draw'] = draws[pos] if (pos>=0).all() else np.where(pos>=0, draws[pos], np.nan) # Replaces the column, so columns shared with another frame stay intact
     return df
 
+
 # %% ../nbs/10_utils.ipynb 31
+# Frame of the given columns (and optionally rows, by position) of df, copying each column at most once
+# Without rows, the columns are shared with df as under pandas copy-on-write, so they should only be replaced, not modified in place
+def take_frame(df, cols, rows=None):
+    if rows is None: return pd.DataFrame({ c: df[c] for c in cols }, copy=False)
+    return pd.DataFrame({ c: df[c].array.take(rows) for c in cols }, index=df.index.take(rows), copy=False) # Index is taken just once
+
+# Like df.assign, but the columns that are not assigned are shared with df instead of copied
+def with_columns(df, **cols):
+    return pd.DataFrame({ **{ c: df[c] for c in df.columns }, **cols }, index=df.index, copy=False)
+
+
+# %% ../nbs/10_utils.ipynb 33
 # Clean kwargs leaving only parameters fn can digest
 def clean_kwargs(fn, kwargs):
     aspec = inspect.getfullargspec(fn)
     return { k:v for k,v in kwargs.items() if k in aspec.args } if aspec.varkw is None else kwargs
 
-# %% ../nbs/10_utils.ipynb 32
+# %% ../nbs/10_utils.ipynb 34
 # Simple one-liner to remove certain keys from a dict
 def censor_dict(d,vs):
     return { k:v for k,v in d.items() if k not in vs }
 
-# %% ../nbs/10_utils.ipynb 33
+# %% ../nbs/10_utils.ipynb 35
 # A nicer behaving wrapper around pd.cut
 def cut_nice(s, breaks, format=''):
     s = np.array(s)
@@ -266,14 +318,14 @@ def cut_nice(s, breaks, format=''):
     return pd.cut(s,breaks,right=False,labels=labels)
     
 
-# %% ../nbs/10_utils.ipynb 35
+# %% ../nbs/10_utils.ipynb 37
 # Utility function to rename categories in pre/post processing steps as pandas made .replace unusable with categories
 def rename_cats(df, col, cat_map):
     if df[col].dtype.name == 'category': 
         df[col] = df[col].cat.rename_categories(cat_map)
     else: df[col] = df[col].replace(cat_map)
 
-# %% ../nbs/10_utils.ipynb 36
+# %% ../nbs/10_utils.ipynb 38
 # Simplify doing multiple replace's on a column
 def str_replace(s,d):
     s = s.astype('object')
@@ -281,7 +333,7 @@ def str_replace(s,d):
         s = s.str.replace(k,v)
     return s
 
-# %% ../nbs/10_utils.ipynb 38
+# %% ../nbs/10_utils.ipynb 40
 # Merge values from multiple columns, iteratively replacing values
 # lst contains either a series or a tuple of (series, whitelist)
 def merge_series(*lst):
@@ -296,7 +348,7 @@ def merge_series(*lst):
             s.loc[~ns.isna()] = ns[~ns.isna()]
     return s
 
-# %% ../nbs/10_utils.ipynb 40
+# %% ../nbs/10_utils.ipynb 42
 # Turn a list of selected/not seleced into a list of selected values in the same dataframe
 def aggregate_multiselect(df, prefix, out_prefix, na_vals=[]):
     cols = [ c for c in df.columns if c.startswith(prefix) ]
@@ -305,7 +357,7 @@ def aggregate_multiselect(df, prefix, out_prefix, na_vals=[]):
     n_res = max(map(len,lst))
     df[[f'{out_prefix}{i+1}' for i in range(n_res)]] = pd.DataFrame(lst)
 
-# %% ../nbs/10_utils.ipynb 41
+# %% ../nbs/10_utils.ipynb 43
 # Take a list of values and create a one-hot matrix of them. Basically the inverse of previous
 def deaggregate_multiselect(df, prefix, out_prefix=''):
     cols = [ c for c in df.columns if c.startswith(prefix) ]
@@ -317,7 +369,7 @@ def deaggregate_multiselect(df, prefix, out_prefix=''):
     # Create a one-hot column for each
     for oc in ocols: df[out_prefix+oc] = (df[cols]==oc).any(axis=1)
 
-# %% ../nbs/10_utils.ipynb 42
+# %% ../nbs/10_utils.ipynb 44
 # Groupby if needed - this simplifies things quite often
 def gb_in(df, gb_cols):
     return df.groupby(gb_cols,observed=False) if len(gb_cols)>0 else df
@@ -331,7 +383,7 @@ def gb_in_apply(df, gb_cols, fn, cols=None, **kwargs):
     else: res = df.groupby(gb_cols,observed=False)[cols].apply(fn,**kwargs)
     return res
 
-# %% ../nbs/10_utils.ipynb 43
+# %% ../nbs/10_utils.ipynb 45
 def stk_defaultdict(dv):
     if not isinstance(dv,dict): dv = {'default':dv}
     return defaultdict(lambda: dv['default'], dv)